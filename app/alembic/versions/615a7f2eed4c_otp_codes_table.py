@@ -0,0 +1,58 @@
+"""otp codes table
+
+Revision ID: 615a7f2eed4c
+Revises: 8d9eb36ab536
+Create Date: 2026-10-17 11:26:05.302371
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "615a7f2eed4c"
+down_revision: Union[str, Sequence[str], None] = "8d9eb36ab536"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "otp_codes",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("channel", sa.String(length=20), nullable=False),
+        sa.Column("target", sa.String(length=255), nullable=False),
+        sa.Column("code_hash", sa.String(length=64), nullable=False),
+        sa.Column("attempts", sa.Integer(), server_default="0", nullable=False),
+        sa.Column("expires_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column(
+            "created_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.func.now(),
+            nullable=True,
+        ),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("channel", "target", name="uq_otp_codes_channel_target"),
+    )
+    op.create_index(
+        op.f("ix_otp_codes_expires_at"), "otp_codes", ["expires_at"], unique=False
+    )
+    # pending codes are short-lived; they are simply re-requested after deploy
+    op.drop_column("users", "email_otp_code")
+    op.drop_column("users", "email_otp_expires_at")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.add_column(
+        "users",
+        sa.Column("email_otp_expires_at", sa.DateTime(timezone=True), nullable=True),
+    )
+    op.add_column(
+        "users", sa.Column("email_otp_code", sa.String(length=6), nullable=True)
+    )
+    op.drop_index(op.f("ix_otp_codes_expires_at"), table_name="otp_codes")
+    op.drop_table("otp_codes")
@@ -0,0 +1,100 @@
+"""users lower(email) index
+
+Revision ID: 8b3c5bdcfab2
+Revises: 615a7f2eed4c
+Create Date: 2026-10-17 14:02:51.613207
+
+Case-insensitive uniqueness for users.email, covering the login lookup.
+
+On PostgreSQL the index is built with CREATE INDEX CONCURRENTLY outside
+the migration transaction, so a large, live users table keeps taking
+writes while it builds. If a build is interrupted it leaves an INVALID
+index behind; re-running the migration drops that and starts over.
+
+Existing case-variant duplicates (Foo@x.com / foo@x.com) would make the
+build fail halfway, so they are checked for first and have to be merged
+by hand.
+
+The exact-match ix_users_email stays: instances still on the previous
+release use it as their ON CONFLICT (email) arbiter during a rolling
+deploy. It can be dropped once every instance uses lower(email).
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "8b3c5bdcfab2"
+down_revision: Union[str, Sequence[str], None] = "615a7f2eed4c"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEX_NAME = "ix_users_email_lower"
+# email itself is included because the planner only picks an index-only
+# scan on an expression index when the underlying column is in the index
+INCLUDE_COLUMNS = ["email", "uuid", "password_hash", "is_active"]
+
+
+def _check_case_duplicates(bind) -> None:
+    duplicates = bind.execute(
+        sa.text(
+            "SELECT lower(email), count(*) FROM users WHERE email IS NOT NULL "
+            "GROUP BY lower(email) HAVING count(*) > 1 LIMIT 20"
+        )
+    ).all()
+    if duplicates:
+        listed = ", ".join(f"{email} (x{count})" for email, count in duplicates)
+        raise RuntimeError(
+            f"users has emails differing only in case: {listed}. "
+            f"Merge or rename these accounts, then re-run the migration."
+        )
+
+
+def _is_invalid_index(bind, name: str) -> bool:
+    return bool(
+        bind.execute(
+            sa.text(
+                "SELECT NOT i.indisvalid FROM pg_index i "
+                "JOIN pg_class c ON c.oid = i.indexrelid WHERE c.relname = :name"
+            ),
+            {"name": name},
+        ).scalar()
+    )
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    if bind.dialect.name != "postgresql":
+        op.create_index(INDEX_NAME, "users", [sa.text("lower(email)")], unique=True)
+        return
+
+    _check_case_duplicates(bind)
+    with op.get_context().autocommit_block():
+        if _is_invalid_index(bind, INDEX_NAME):
+            op.drop_index(INDEX_NAME, table_name="users", postgresql_concurrently=True)
+        op.create_index(
+            INDEX_NAME,
+            "users",
+            [sa.text("lower(email)")],
+            unique=True,
+            if_not_exists=True,
+            postgresql_include=INCLUDE_COLUMNS,
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name != "postgresql":
+        op.drop_index(INDEX_NAME, table_name="users")
+        return
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            INDEX_NAME,
+            table_name="users",
+            if_exists=True,
+            postgresql_concurrently=True,
+        )
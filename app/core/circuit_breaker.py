@@ -0,0 +1,76 @@
+import time
+
+
+class CircuitOpenError(RuntimeError):
+    """
+    Raised instead of calling a provider while its circuit is open.
+    """
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"{name} is temporarily unavailable (circuit open)")
+        self.name = name
+        self.retry_after = max(1, int(retry_after + 0.999))
+
+
+class CircuitBreaker:
+    """
+    Minimal consecutive-failure circuit breaker for outbound provider calls.
+
+    - closed:    calls go through; `failure_threshold` failures in a row open it
+    - open:      calls fail fast with CircuitOpenError for `reset_timeout` seconds
+    - half-open: one trial call is let through; success closes the circuit,
+                 failure opens it again
+
+    Used only from the event loop thread, so plain attributes are enough.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, failure_threshold: int, reset_timeout: float):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+
+    def before_call(self) -> None:
+        if self.state == self.CLOSED:
+            return
+
+        elapsed = time.monotonic() - self._opened_at
+        if self.state == self.OPEN:
+            if elapsed < self.reset_timeout:
+                raise CircuitOpenError(self.name, self.reset_timeout - elapsed)
+            self.state = self.HALF_OPEN
+
+        # half-open: only one probe at a time
+        if self._trial_in_flight:
+            raise CircuitOpenError(self.name, 1)
+        self._trial_in_flight = True
+
+    def record_success(self) -> None:
+        self.state = self.CLOSED
+        self.failures = 0
+        self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        self._trial_in_flight = False
+        self.failures += 1
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            self.state = self.OPEN
+            self._opened_at = time.monotonic()
+
+    def record_cancelled(self) -> None:
+        """
+        The call ended without an answer from the provider (cancelled, or
+        an unexpected error): no verdict, just free the half-open trial slot.
+        Callers must reach one of the record_* methods on every path.
+        """
+        self._trial_in_flight = False
+
+    def stats(self) -> dict:
+        return {"state": self.state, "consecutive_failures": self.failures}
@@ -0,0 +1,10 @@
+"""
+Loads .env once per process.
+
+Modules that read their settings from os.environ import this first.
+Real environment variables win over values from .env.
+"""
+
+from dotenv import load_dotenv
+
+load_dotenv()
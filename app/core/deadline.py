@@ -0,0 +1,204 @@
+"""
+Per-request deadlines.
+
+DeadlineMiddleware gives every request a time budget (REQUEST_DEADLINE_SECONDS,
+or a per-path override) and keeps the absolute deadline in a context
+variable, so work done on the request's behalf can see how much is left:
+
+- each DB transaction starts with SET LOCAL statement_timeout (the time
+  left, minus DEADLINE_DB_MARGIN_SECONDS so Postgres cancels first) and
+  lock_timeout (at most DEADLINE_LOCK_TIMEOUT_SECONDS)
+- Twilio / SendGrid calls time out at min(their own timeout, time left)
+- whatever is still running when the budget is gone is cancelled
+
+The client gets 504 when the budget runs out, or 503 + Retry-After when
+a row lock couldn't be had in time; either way the worker slot and the
+pooled connection are freed.
+
+Background work (outbox, health probes, spawn()ed tasks) runs without a
+deadline.
+"""
+
+import asyncio
+import os
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+import orjson
+from fastapi import HTTPException, status
+from sqlalchemy import event, exc, text
+from sqlalchemy.orm import Session
+
+from app.core import metrics
+
+# 🔹 Deadline config from env (0 disables)
+REQUEST_DEADLINE_SECONDS = float(os.getenv("REQUEST_DEADLINE_SECONDS", "10"))
+# "path prefix=seconds" pairs, longest prefix wins; 0 = no deadline. The
+# admin import / export stream for as long as the data takes.
+REQUEST_DEADLINE_OVERRIDES = {
+    path.strip(): float(seconds)
+    for path, _, seconds in (
+        pair.partition("=")
+        for pair in os.getenv(
+            "REQUEST_DEADLINE_OVERRIDES",
+            "/api/v1/admin/users/import=0,/api/v1/admin/users/export=0",
+        ).split(",")
+        if pair.strip()
+    )
+}
+DEADLINE_DB_MARGIN_SECONDS = float(os.getenv("DEADLINE_DB_MARGIN_SECONDS", "0.1"))
+DEADLINE_LOCK_TIMEOUT_SECONDS = float(os.getenv("DEADLINE_LOCK_TIMEOUT_SECONDS", "2"))
+DEADLINE_RETRY_AFTER = int(os.getenv("DEADLINE_RETRY_AFTER", "1"))
+
+_SET_TIMEOUTS = text(
+    "SELECT set_config('statement_timeout', :statement_timeout, true), "
+    "set_config('lock_timeout', :lock_timeout, true)"
+)
+
+# Postgres SQLSTATEs for statement_timeout / lock_timeout cancellations
+QUERY_CANCELED = "57014"
+LOCK_NOT_AVAILABLE = "55P03"
+
+# time.monotonic() at which the current request's budget runs out
+_deadline: ContextVar[Optional[float]] = ContextVar("request_deadline", default=None)
+
+
+class DeadlineExceeded(HTTPException):
+    def __init__(self):
+        super().__init__(
+            status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+            detail="Request deadline exceeded",
+        )
+
+
+def budget_for(path: str) -> float:
+    matches = [p for p in REQUEST_DEADLINE_OVERRIDES if path.startswith(p)]
+    if matches:
+        return REQUEST_DEADLINE_OVERRIDES[max(matches, key=len)]
+    return REQUEST_DEADLINE_SECONDS
+
+
+def remaining() -> Optional[float]:
+    """Seconds left for the current request; None without a deadline."""
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+
+def clear() -> None:
+    """Detach the current context (e.g. a background task) from the deadline."""
+    _deadline.set(None)
+
+
+def clamp(timeout_seconds: float, stage: str) -> float:
+    """
+    `timeout_seconds` cut down to the time left. Raises DeadlineExceeded
+    right away when nothing is left, rather than starting the call.
+    """
+    left = remaining()
+    if left is None:
+        return timeout_seconds
+    if left <= 0:
+        metrics.request_deadline_exceeded_total.inc(stage)
+        raise DeadlineExceeded()
+    return min(timeout_seconds, left)
+
+
+def expired() -> bool:
+    left = remaining()
+    return left is not None and left <= 0
+
+
+@event.listens_for(Session, "after_begin")
+def _set_db_timeouts(session, transaction, connection) -> None:
+    left = remaining()
+    if left is None or connection.dialect.name != "postgresql":
+        return
+    statement_timeout = clamp(left - DEADLINE_DB_MARGIN_SECONDS, "db")
+    lock_timeout = min(statement_timeout, DEADLINE_LOCK_TIMEOUT_SECONDS)
+    # one round trip for both; like SET LOCAL, they end with the transaction
+    connection.execute(
+        _SET_TIMEOUTS,
+        {
+            "statement_timeout": f"{max(int(statement_timeout * 1000), 1)}ms",
+            "lock_timeout": f"{max(int(lock_timeout * 1000), 1)}ms",
+        },
+    )
+
+
+def _sqlstate(error: exc.DBAPIError) -> Optional[str]:
+    # asyncpg errors carry it as .sqlstate; psycopg / the adapters as .pgcode
+    original = error.orig
+    return getattr(original, "sqlstate", None) or getattr(original, "pgcode", None)
+
+
+async def _send_error(send, status_code: int, detail: str, headers=()) -> None:
+    body = orjson.dumps({"detail": detail})
+    await send(
+        {
+            "type": "http.response.start",
+            "status": status_code,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                *headers,
+            ],
+        }
+    )
+    await send({"type": "http.response.body", "body": body})
+
+
+class DeadlineMiddleware:
+    """
+    Pure ASGI middleware: sets the request's deadline and turns running
+    out of it into a 504 (or 503 for lock timeouts) if no response has
+    started yet.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        budget = budget_for(scope["path"])
+        if budget <= 0:
+            return await self.app(scope, receive, send)
+
+        started = False
+
+        async def send_wrapper(message):
+            nonlocal started
+            if message["type"] == "http.response.start":
+                started = True
+            await send(message)
+
+        token = _deadline.set(time.monotonic() + budget)
+        try:
+            async with asyncio.timeout(budget) as timeout:
+                await self.app(scope, receive, send_wrapper)
+        except TimeoutError:
+            # not ours if the budget isn't used up (e.g. a provider timeout)
+            if not timeout.expired() or started:
+                raise
+            metrics.request_deadline_exceeded_total.inc("request")
+            await _send_error(send, 504, "Request deadline exceeded")
+        except exc.DBAPIError as e:
+            sqlstate = _sqlstate(e)
+            if started or sqlstate not in (QUERY_CANCELED, LOCK_NOT_AVAILABLE):
+                raise
+            if sqlstate == QUERY_CANCELED:
+                metrics.request_deadline_exceeded_total.inc("db_statement")
+                await _send_error(send, 504, "Request deadline exceeded")
+            else:
+                metrics.request_deadline_exceeded_total.inc("db_lock")
+                await _send_error(
+                    send,
+                    503,
+                    "Resource is busy, please retry later",
+                    [(b"retry-after", str(DEADLINE_RETRY_AFTER).encode())],
+                )
+        finally:
+            _deadline.reset(token)
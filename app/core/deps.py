@@ -1,35 +1,152 @@
-from typing import Generator
+from dataclasses import dataclass
+from uuid import UUID
 
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
-from sqlalchemy.orm import Session
-from app.db import get_db
-from app.models.user import User
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db import get_read_db, use_primary
+from app.models.user import User, UserRole
+from app.core.revocation import revocation_list
 from app.core.security import JWT_SECRET_KEY, JWT_ALGORITHM
+from app.core.user_cache import CachedUser, user_cache
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/email/login")
 
 
-def get_curret_user(
-    token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db),
-) -> User:
-    credentials_exception = HTTPException(
+@dataclass(frozen=True, slots=True)
+class TokenUser:
+    """
+    Identity taken from verified token claims (no database row behind it).
+    """
+
+    uuid: UUID
+    role: str
+    is_active: bool
+    token_version: int
+
+
+def credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
 
+
+def _decode_token(token: str) -> tuple[UUID, dict]:
     try:
         payload = jwt.decode(token, JWT_SECRET_KEY, algorithms=[JWT_ALGORITHM])
-        user_uuid: str = payload.get("sub")
-        if user_uuid is None:
-            raise credentials_exception
-    except JWTError:
-        raise credentials_exception
+        subject: str = payload.get("sub")
+        if subject is None:
+            raise credentials_exception()
+        return UUID(subject), payload
+    except (JWTError, ValueError):
+        raise credentials_exception()
+
 
-    user = db.query(User).filter(User.uuid == user_uuid).first()
+async def load_user(db: AsyncSession, user_uuid: UUID) -> CachedUser:
+    cached = user_cache.get(user_uuid)
+    if cached is not None:
+        return cached
+
+    query = select(User).where(User.uuid == user_uuid)
+    use_primary(db, user_uuid)
+    user = await db.scalar(query)
+    if user is None and use_primary(db):
+        # not on the replica yet, e.g. signed up a moment ago on another worker
+        user = await db.scalar(query)
     if user is None:
-        raise credentials_exception
+        raise credentials_exception()
+
+    cached = CachedUser.from_user(user)
+    user_cache.put(cached)
+    return cached
+
+
+async def get_curret_user(
+    token: str = Depends(oauth2_scheme),
+    db: AsyncSession = Depends(get_read_db),
+) -> CachedUser:
+    """
+    Resolve the bearer token to a read-only snapshot of the user.
+
+    Snapshots are served from `user_cache` when possible; handlers that
+    write the user must load the row themselves and invalidate the entry.
+    """
+    user_uuid, _ = _decode_token(token)
+    user = await load_user(db, user_uuid)
+    # the snapshot is all the handler gets from this lookup; don't keep its
+    # transaction (and pooled connection) open while the handler runs,
+    # e.g. through a bcrypt hash. A no-op when the cache answered.
+    await db.rollback()
     return user
+
+
+async def get_token_user(
+    token: str = Depends(oauth2_scheme),
+    db: AsyncSession = Depends(get_read_db),
+) -> TokenUser:
+    """
+    DB-free variant of `get_curret_user` for read-heavy routes.
+
+    Claims-carrying tokens (JWT_CLAIMS_TOKENS) are trusted once the
+    signature verifies and the user is not in `revocation_list`. Plain
+    `sub`-only tokens fall back to the cached user lookup, and so do
+    claims tokens while this worker has no loaded deny-set (the flag was
+    switched off with such tokens still live, or the first refresh failed).
+    """
+    user_uuid, payload = _decode_token(token)
+
+    if "ver" in payload and not revocation_list.loaded:
+        try:
+            token_version = int(payload["ver"])
+        except (TypeError, ValueError):
+            raise credentials_exception()
+        user = await load_user(db, user_uuid)
+        # same rules as the deny-set: inactive users and bumped versions
+        if not user.is_active or token_version < user.token_version:
+            raise credentials_exception()
+        return TokenUser(
+            uuid=user.uuid,
+            role=user.role,
+            is_active=user.is_active,
+            token_version=user.token_version,
+        )
+
+    if "ver" not in payload:
+        user = await load_user(db, user_uuid)
+        return TokenUser(
+            uuid=user.uuid,
+            role=user.role,
+            is_active=user.is_active,
+            token_version=user.token_version,
+        )
+
+    try:
+        token_user = TokenUser(
+            uuid=user_uuid,
+            role=str(payload["role"]),
+            is_active=bool(payload["is_active"]),
+            token_version=int(payload["ver"]),
+        )
+    except (KeyError, TypeError, ValueError):
+        raise credentials_exception()
+
+    if not token_user.is_active or revocation_list.is_revoked(
+        token_user.uuid, token_user.token_version
+    ):
+        raise credentials_exception()
+    return token_user
+
+
+async def require_admin(
+    current_user: CachedUser = Depends(get_curret_user),
+) -> CachedUser:
+    if current_user.role != UserRole.ADMIN or not current_user.is_active:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin access required",
+        )
+    return current_user
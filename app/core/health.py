@@ -0,0 +1,197 @@
+"""
+Background health prober.
+
+Probe endpoints never touch the database or the providers themselves:
+one background task checks each dependency every HEALTH_PROBE_INTERVAL_SECONDS
+and the endpoints read the cached results. However often orchestrators and
+load balancers poll, the cost stays at one pooled connection (and one
+provider request each) per interval, and a slow dependency can't stall the
+probe responses.
+
+A result older than HEALTH_STALE_SECONDS counts as down, so a stuck or
+crashed prober fails readiness instead of reporting stale "ok"s forever.
+
+Readiness can also be held regardless of the checks (hold / release),
+e.g. while the app warms up or drains.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Optional
+
+from sqlalchemy import text
+
+from app.db import engine, read_router, replica_engines
+from app.services.sendgrid.service import mailer
+from app.services.twilio.service import twilio_verify
+
+logger = logging.getLogger(__name__)
+
+# 🔹 Health probe config from env
+HEALTH_PROBE_INTERVAL_SECONDS = float(os.getenv("HEALTH_PROBE_INTERVAL_SECONDS", "10"))
+HEALTH_PROBE_TIMEOUT_SECONDS = float(os.getenv("HEALTH_PROBE_TIMEOUT_SECONDS", "2"))
+HEALTH_STALE_SECONDS = float(os.getenv("HEALTH_STALE_SECONDS", "30"))
+# checks that must be "ok" for /health/ready; providers are reported but,
+# by default, an SMS/email outage doesn't pull every instance out of rotation
+HEALTH_READY_CHECKS = tuple(
+    name.strip()
+    for name in os.getenv("HEALTH_READY_CHECKS", "db").split(",")
+    if name.strip()
+)
+
+OK = "ok"
+# reachable but unhappy (e.g. the provider rejects our credentials)
+DEGRADED = "degraded"
+DOWN = "down"
+
+
+@dataclass
+class ProbeResult:
+    status: str
+    latency_ms: float
+    checked_at: float
+    error: Optional[str] = None
+
+    def as_dict(self, now: float) -> dict:
+        return {
+            "status": self.status,
+            "latency_ms": self.latency_ms,
+            "age_seconds": round(now - self.checked_at, 1),
+            "error": self.error,
+        }
+
+
+async def check_db() -> str:
+    async with engine.connect() as conn:
+        await conn.execute(text("SELECT 1"))
+    return OK
+
+
+async def _ping_replica(replica) -> bool:
+    try:
+        # inside the probe's own timeout, so a hung replica is marked down
+        # here rather than the whole check being cancelled first
+        async with asyncio.timeout(HEALTH_PROBE_TIMEOUT_SECONDS * 0.75):
+            async with replica.connect() as conn:
+                await conn.execute(text("SELECT 1"))
+    except asyncio.CancelledError:
+        read_router.mark_down(replica)
+        raise
+    except Exception:
+        read_router.mark_down(replica)
+        return False
+    read_router.mark_up(replica)
+    return True
+
+
+async def check_db_replicas() -> str:
+    """
+    Also what brings a failed replica back into rotation. Reads fall back
+    to the primary, so even all replicas down is only "degraded".
+    """
+    up = await asyncio.gather(*(_ping_replica(replica) for replica in replica_engines))
+    return OK if all(up) else DEGRADED
+
+
+def _http_status(status_code: int) -> str:
+    if status_code >= 500 or status_code == 429:
+        return DOWN
+    return DEGRADED if status_code >= 400 else OK
+
+
+async def check_twilio() -> str:
+    return _http_status(await twilio_verify.ping(HEALTH_PROBE_TIMEOUT_SECONDS))
+
+
+async def check_sendgrid() -> str:
+    return _http_status(await mailer.ping(HEALTH_PROBE_TIMEOUT_SECONDS))
+
+
+class HealthProber:
+    def __init__(
+        self,
+        checks: dict[str, Callable[[], Awaitable[str]]],
+        ready_checks: tuple = HEALTH_READY_CHECKS,
+        timeout_seconds: float = HEALTH_PROBE_TIMEOUT_SECONDS,
+        stale_seconds: float = HEALTH_STALE_SECONDS,
+    ):
+        self.checks = checks
+        self.ready_checks = ready_checks
+        self.timeout_seconds = timeout_seconds
+        self.stale_seconds = stale_seconds
+        self.results: dict[str, ProbeResult] = {}
+        self.holds: set[str] = set()
+
+    async def _probe(self, name: str) -> None:
+        start = time.perf_counter()
+        error = None
+        try:
+            async with asyncio.timeout(self.timeout_seconds):
+                status = await self.checks[name]()
+        except TimeoutError:
+            status, error = DOWN, f"timed out after {self.timeout_seconds}s"
+        except Exception as e:
+            status, error = DOWN, repr(e)
+        self.results[name] = ProbeResult(
+            status=status,
+            latency_ms=round((time.perf_counter() - start) * 1000, 2),
+            checked_at=time.time(),
+            error=error,
+        )
+        if status != OK:
+            logger.warning("Health check %s is %s: %s", name, status, error)
+
+    async def probe_all(self) -> None:
+        await asyncio.gather(*(self._probe(name) for name in self.checks))
+
+    async def run(self, interval: Optional[float] = None) -> None:
+        """
+        Probe forever; meant to run as a background task from lifespan.
+        """
+        interval = interval or HEALTH_PROBE_INTERVAL_SECONDS
+        while True:
+            await asyncio.sleep(interval)
+            await self.probe_all()
+
+    def status(self, name: str, now: Optional[float] = None) -> str:
+        result = self.results.get(name)
+        now = now or time.time()
+        if result is None or now - result.checked_at > self.stale_seconds:
+            return DOWN
+        return result.status
+
+    def hold(self, reason: str) -> None:
+        """Report not ready until `release(reason)`."""
+        self.holds.add(reason)
+
+    def release(self, reason: str) -> None:
+        self.holds.discard(reason)
+
+    def ready(self) -> bool:
+        if self.holds:
+            return False
+        now = time.time()
+        return all(self.status(name, now) == OK for name in self.ready_checks)
+
+    def snapshot(self) -> dict:
+        now = time.time()
+        checks = {}
+        for name in self.checks:
+            result = self.results.get(name)
+            if result is None:
+                checks[name] = {"status": DOWN, "error": "not probed yet"}
+                continue
+            checks[name] = result.as_dict(now)
+            if self.status(name, now) != result.status:
+                checks[name].update(status=DOWN, error="stale result")
+        return checks
+
+
+health_prober = HealthProber(
+    {"db": check_db, "twilio": check_twilio, "sendgrid": check_sendgrid}
+)
+if replica_engines:
+    health_prober.checks["db_replicas"] = check_db_replicas
@@ -0,0 +1,151 @@
+"""
+Warm-up after startup and drain before shutdown.
+
+Warm-up runs once the server is listening, with readiness held until it
+is done (liveness answers meanwhile):
+- opens WARMUP_DB_CONNECTIONS pool connections at once, on the primary
+  and on each read replica, so the first requests after a deploy don't
+  each wait on a connect + auth handshake
+- starts every password-pool worker with one real bcrypt hash
+- signs, decodes and serializes a token response once and builds the
+  OpenAPI schema, so that first-use work isn't paid by a user request
+
+A failed warm-up step is logged and skipped; readiness then only depends
+on the health checks.
+
+Drain runs after the server stops accepting connections and in-flight
+requests are done (uvicorn's --timeout-graceful-shutdown, see launcher):
+readiness is held, the outbox sends what is already due, and tasks
+started with spawn() get SHUTDOWN_DRAIN_SECONDS to finish before they
+are cancelled.
+"""
+
+import asyncio
+import logging
+import os
+import uuid
+from contextlib import AsyncExitStack
+from contextvars import copy_context
+from typing import Coroutine
+
+from fastapi import FastAPI
+from jose import jwt
+from sqlalchemy import text
+
+from app.core import deadline
+from app.core.health import health_prober
+from app.core.password_pool import warm_password_pool
+from app.core.responses import token_response
+from app.core.security import JWT_ALGORITHM, JWT_SECRET_KEY, create_user_access_token
+from app.core.startup import startup_report
+from app.core.user_cache import CachedUser
+from app.db import DB_POOL_SIZE, engine, replica_engines
+from app.models.user import UserRole
+from app.services.outbox.service import outbox_dispatcher
+
+logger = logging.getLogger(__name__)
+
+# 🔹 Lifecycle config from env
+WARMUP_ENABLED = os.getenv("WARMUP_ENABLED", "true").lower() == "true"
+WARMUP_DB_CONNECTIONS = int(os.getenv("WARMUP_DB_CONNECTIONS", str(DB_POOL_SIZE)))
+SHUTDOWN_DRAIN_SECONDS = float(os.getenv("SHUTDOWN_DRAIN_SECONDS", "10"))
+
+WARMING_UP = "warming_up"
+DRAINING = "draining"
+
+# fire-and-forget tasks still running; also the strong reference each one
+# needs, since the event loop only keeps weak ones
+_spawned: set[asyncio.Task] = set()
+
+
+def spawn(coro: Coroutine) -> asyncio.Task:
+    """
+    Run `coro` in the background, off the request path and free of the
+    request's deadline. Shutdown waits for it (up to SHUTDOWN_DRAIN_SECONDS)
+    instead of dropping it.
+    """
+    context = copy_context()
+    context.run(deadline.clear)
+    task = asyncio.create_task(coro, context=context)
+    _spawned.add(task)
+    task.add_done_callback(_spawned.discard)
+    return task
+
+
+async def warm_db_pool(db_engine, connections: int) -> None:
+    # SQLite has no sized pool: a single connection is all there is to open
+    if hasattr(db_engine.pool, "size"):
+        connections = min(connections, db_engine.pool.size())
+    else:
+        connections = 1
+    async with AsyncExitStack() as stack:
+        conns = await asyncio.gather(
+            *(
+                stack.enter_async_context(db_engine.connect())
+                for _ in range(connections)
+            )
+        )
+        await asyncio.gather(*(conn.execute(text("SELECT 1")) for conn in conns))
+    # leaving the stack checks them all back in as idle pool connections
+
+
+def warm_serializers(app: FastAPI) -> None:
+    user = CachedUser(
+        id=0,
+        uuid=uuid.uuid4(),
+        email="warm-up@example.com",
+        phone_number=None,
+        auth_provider="email",
+        role=UserRole.USER,
+        is_active=True,
+        is_phone_verified=False,
+        is_email_verified=False,
+        token_version=0,
+    )
+    token = create_user_access_token(user)
+    jwt.decode(token, JWT_SECRET_KEY, algorithms=[JWT_ALGORITHM])
+    token_response(token, user)
+    app.openapi()
+
+
+async def warm_up(app: FastAPI) -> None:
+    """
+    Meant to run as a background task from lifespan, with readiness held
+    (WARMING_UP) by the caller; released here when done.
+    """
+    steps = {
+        "warmup_db_pool": lambda: asyncio.gather(
+            *(
+                warm_db_pool(db_engine, WARMUP_DB_CONNECTIONS)
+                for db_engine in (engine, *replica_engines)
+            )
+        ),
+        "warmup_password_pool": warm_password_pool,
+        "warmup_serializers": lambda: asyncio.to_thread(warm_serializers, app),
+    }
+    try:
+        for name, step in steps.items():
+            with startup_report.phase(name):
+                try:
+                    await step()
+                except Exception:
+                    logger.exception("Warm-up step %s failed", name)
+    finally:
+        health_prober.release(WARMING_UP)
+
+
+async def drain(outbox_task: asyncio.Task) -> None:
+    health_prober.hold(DRAINING)
+    outbox_dispatcher.stop()
+    done, pending = await asyncio.wait(
+        {outbox_task, *_spawned}, timeout=SHUTDOWN_DRAIN_SECONDS
+    )
+    if pending:
+        logger.warning(
+            "Cancelling %d background task(s) still running after %gs drain",
+            len(pending),
+            SHUTDOWN_DRAIN_SECONDS,
+        )
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
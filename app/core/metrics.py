@@ -0,0 +1,341 @@
+"""
+In-process metrics rendered in the Prometheus text format at /metrics.
+
+Every observation happens on the event loop thread (request handling,
+SQLAlchemy pool checkouts under the asyncio greenlet, awaiting the
+password / provider calls), so updates are plain dict and list writes
+with no locks. Gauges that mirror existing state (pool usage, breaker
+state) are computed from callbacks at scrape time instead of being kept
+in sync on the hot path.
+
+Values are per process: with several uvicorn workers, scrape each one
+or run one worker per container.
+"""
+
+import math
+import os
+import time
+from bisect import bisect_left
+from typing import Callable, Iterable, Optional
+
+import httpx
+
+# 🔹 Metrics config from env
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(str(v))}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def _lines(self) -> Iterable[str]:
+        raise NotImplementedError
+
+    def render(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} {self.kind}"
+        yield from self._lines()
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: dict[tuple, float] = {}
+
+    def inc(self, *labels, amount: float = 1.0) -> None:
+        self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def _lines(self):
+        for labels, value in list(self._values.items()):
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: dict[tuple, float] = {}
+        self._function: Optional[Callable[[], dict[tuple, float]]] = None
+
+    def set(self, value: float, *labels) -> None:
+        self._values[labels] = value
+
+    def inc(self, *labels, amount: float = 1.0) -> None:
+        self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def dec(self, *labels, amount: float = 1.0) -> None:
+        self.inc(*labels, amount=-amount)
+
+    def set_function(self, function: Callable[[], dict[tuple, float]]) -> None:
+        """
+        Read the value(s) at scrape time: `function` returns
+        {label values tuple: value}, e.g. {(): 3} for an unlabelled gauge.
+        """
+        self._function = function
+
+    def _lines(self):
+        values = dict(self._values)
+        if self._function is not None:
+            values.update(self._function())
+        for labels, value in values.items():
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple = (),
+        buckets: tuple = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        # labels -> [per-bucket counts..., sum]
+        self._values: dict[tuple, list] = {}
+
+    def observe(self, value: float, *labels) -> None:
+        series = self._values.get(labels)
+        if series is None:
+            series = self._values[labels] = [0] * len(self.buckets) + [0.0]
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def _lines(self):
+        for labels, series in list(self._values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}"
+            label_text = _format_labels(self.labelnames, labels)
+            yield f"{self.name}_sum{label_text} {_format_value(series[-1])}"
+            yield f"{self.name}_count{label_text} {cumulative}"
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Duplicate metric {metric.name}")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+# 🔹 HTTP
+http_requests_total = registry.register(
+    Counter(
+        "http_requests_total",
+        "HTTP requests by route template and status.",
+        ("method", "route", "status"),
+    )
+)
+http_request_duration_seconds = registry.register(
+    Histogram(
+        "http_request_duration_seconds",
+        "HTTP request latency by route template and status.",
+        ("method", "route", "status"),
+    )
+)
+http_requests_in_progress = registry.register(
+    Gauge("http_requests_in_progress", "HTTP requests currently being served.")
+)
+request_deadline_exceeded_total = registry.register(
+    Counter(
+        "request_deadline_exceeded_total",
+        "Requests that ran out of their deadline, by where it ran out.",
+        ("stage",),
+    )
+)
+
+# 🔹 Database pool (in-use / size gauges are wired up in app/db.py)
+db_pool_checkout_wait_seconds = registry.register(
+    Histogram(
+        "db_pool_checkout_wait_seconds",
+        "Time spent waiting for a pooled DB connection.",
+        buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 30),
+    )
+)
+db_pool_checkout_timeouts_total = registry.register(
+    Counter(
+        "db_pool_checkout_timeouts_total",
+        "Checkouts that gave up after DB_POOL_TIMEOUT.",
+    )
+)
+db_pool_connections = registry.register(
+    Gauge(
+        "db_pool_connections",
+        "Pooled DB connections by state (checked_out / idle / overflow).",
+        ("state",),
+    )
+)
+db_pool_size = registry.register(Gauge("db_pool_size", "Configured DB pool size."))
+
+# 🔹 Password hashing
+password_hash_duration_seconds = registry.register(
+    Histogram(
+        "password_hash_duration_seconds",
+        "bcrypt CPU time per call, measured inside the password pool.",
+        ("op",),
+        buckets=(0.01, 0.025, 0.05, 0.1, 0.2, 0.3, 0.5, 1, 2, 5),
+    )
+)
+password_pool_wait_seconds = registry.register(
+    Histogram(
+        "password_pool_wait_seconds",
+        "Time a bcrypt job waited for a free password pool worker.",
+        ("op",),
+    )
+)
+password_pool_rejected_total = registry.register(
+    Counter(
+        "password_pool_rejected_total",
+        "bcrypt jobs rejected with 503 because the password pool was full.",
+        ("op",),
+    )
+)
+password_pool_in_flight = registry.register(
+    Gauge("password_pool_in_flight", "bcrypt jobs running or queued.")
+)
+password_rehash_total = registry.register(
+    Counter(
+        "password_rehash_total",
+        "Login-time upgrades of outdated password hashes "
+        "(upgraded / busy / changed).",
+        ("result",),
+    )
+)
+
+# 🔹 External providers (Twilio / SendGrid)
+provider_request_duration_seconds = registry.register(
+    Histogram(
+        "provider_request_duration_seconds",
+        "Latency of calls to external providers.",
+        ("provider", "operation"),
+    )
+)
+provider_errors_total = registry.register(
+    Counter(
+        "provider_errors_total",
+        "Failed provider calls by reason "
+        "(timeout / transport / http_4xx / http_5xx / http_429 / circuit_open).",
+        ("provider", "operation", "reason"),
+    )
+)
+provider_circuit_open = registry.register(
+    Gauge(
+        "provider_circuit_open",
+        "1 while a provider's circuit breaker is open or half-open.",
+        ("provider",),
+    )
+)
+
+singleflight_shared_total = registry.register(
+    Counter(
+        "singleflight_shared_total",
+        "Duplicate calls answered by a shared in-flight call or a just-finished one.",
+        ("name", "source"),
+    )
+)
+
+_circuit_breakers: list = []
+
+
+def track_circuit_breaker(breaker) -> None:
+    _circuit_breakers.append(breaker)
+
+
+provider_circuit_open.set_function(
+    lambda: {(b.name,): int(b.state != b.CLOSED) for b in _circuit_breakers}
+)
+
+
+def provider_error_reason(error: Exception) -> str:
+    if isinstance(error, (TimeoutError, httpx.TimeoutException)):
+        return "timeout"
+    return "transport"
+
+
+def http_error_reason(status_code: int) -> str:
+    if status_code == 429:
+        return "http_429"
+    return "http_5xx" if status_code >= 500 else "http_4xx"
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware recording latency per route template (never
+    the raw path, to keep label cardinality bounded) and status code.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        http_requests_in_progress.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            http_requests_in_progress.dec()
+            # set by the router on a match
+            route = scope.get("route")
+            labels = (
+                scope["method"],
+                getattr(route, "path", "unmatched"),
+                str(status_code),
+            )
+            http_requests_total.inc(*labels)
+            http_request_duration_seconds.observe(elapsed, *labels)
@@ -0,0 +1,238 @@
+import asyncio
+import hashlib
+import hmac
+import logging
+import os
+import secrets
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db import SessionLocal, dialect_insert
+from app.models.otp import OtpCode
+
+logger = logging.getLogger(__name__)
+
+# 🔹 OTP store config from env
+# "sql": otp_codes table (shared by every worker)
+# "memory": in-process dict, for single-node deployments only
+OTP_BACKEND = os.getenv("OTP_BACKEND", "sql")
+OTP_TTL_SECONDS = int(os.getenv("OTP_TTL_SECONDS", "600"))
+OTP_MAX_ATTEMPTS = int(os.getenv("OTP_MAX_ATTEMPTS", "5"))
+OTP_SWEEP_SECONDS = float(os.getenv("OTP_SWEEP_SECONDS", "300"))
+
+
+class OtpResult:
+    OK = "ok"
+    NOT_FOUND = "not_found"
+    EXPIRED = "expired"
+    INVALID = "invalid"
+    TOO_MANY_ATTEMPTS = "too_many_attempts"
+
+
+def generate_code() -> str:
+    return f"{secrets.randbelow(1_000_000):06d}"
+
+
+def _hash_code(channel: str, target: str, code: str) -> str:
+    # codes are never stored in clear; bound to channel+target
+    return hashlib.sha256(f"{channel}:{target}:{code}".encode("utf-8")).hexdigest()
+
+
+def _failure(attempts: int, live: bool) -> str:
+    if not live:
+        return OtpResult.EXPIRED
+    if attempts > OTP_MAX_ATTEMPTS:
+        return OtpResult.TOO_MANY_ATTEMPTS
+    return OtpResult.INVALID
+
+
+class SqlOtpStore:
+    """
+    OTP codes in the narrow `otp_codes` table.
+
+    - issue():   upsert on (channel, target); joins the caller's transaction
+    - consume(): a matching code is removed with DELETE ... RETURNING in the
+      caller's transaction, so exactly one request can use it
+    - failed attempts are counted in a session of their own and committed
+      right away; the caller's (read-only so far) transaction is rolled
+      back first, so a request never holds two pool connections
+    """
+
+    async def issue(
+        self,
+        db: AsyncSession,
+        channel: str,
+        target: str,
+        ttl_seconds: Optional[int] = None,
+    ) -> tuple[str, datetime]:
+        code = generate_code()
+        expires_at = datetime.now(timezone.utc) + timedelta(
+            seconds=ttl_seconds or OTP_TTL_SECONDS
+        )
+        stmt = dialect_insert(db, OtpCode).values(
+            channel=channel,
+            target=target,
+            code_hash=_hash_code(channel, target, code),
+            attempts=0,
+            expires_at=expires_at,
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[OtpCode.channel, OtpCode.target],
+            set_={
+                "code_hash": stmt.excluded.code_hash,
+                "attempts": 0,
+                "expires_at": stmt.excluded.expires_at,
+                "created_at": func.now(),
+            },
+        )
+        await db.execute(stmt)
+        return code, expires_at
+
+    async def consume(
+        self, db: AsyncSession, channel: str, target: str, code: str
+    ) -> str:
+        # read first: a wrong code then writes nothing in the caller's
+        # transaction, so the rollback below has nothing to undo
+        row = (
+            await db.execute(
+                select(
+                    OtpCode.id,
+                    OtpCode.code_hash,
+                    OtpCode.attempts,
+                    (OtpCode.expires_at > func.now()).label("live"),
+                ).where(OtpCode.channel == channel, OtpCode.target == target)
+            )
+        ).first()
+        if row is None:
+            return OtpResult.NOT_FOUND
+
+        code_hash = _hash_code(channel, target, code)
+        if (
+            row.live
+            and row.attempts < OTP_MAX_ATTEMPTS
+            and hmac.compare_digest(row.code_hash, code_hash)
+        ):
+            consumed = await db.scalar(
+                delete(OtpCode)
+                .where(
+                    OtpCode.id == row.id,
+                    OtpCode.code_hash == code_hash,
+                    OtpCode.expires_at > func.now(),
+                    OtpCode.attempts < OTP_MAX_ATTEMPTS,
+                )
+                .returning(OtpCode.id)
+            )
+            if consumed is not None:
+                # the caller commits this together with its own changes
+                return OtpResult.OK
+
+        # the request is about to fail; keep the attempt count anyway, after
+        # handing the caller's connection back to the pool
+        await db.rollback()
+        async with SessionLocal() as attempt_db:
+            failed = (
+                await attempt_db.execute(
+                    update(OtpCode)
+                    .where(OtpCode.channel == channel, OtpCode.target == target)
+                    .values(attempts=OtpCode.attempts + 1)
+                    .returning(
+                        OtpCode.attempts,
+                        (OtpCode.expires_at > func.now()).label("live"),
+                    )
+                )
+            ).first()
+            await attempt_db.commit()
+        if failed is None:
+            return OtpResult.NOT_FOUND
+        return _failure(failed.attempts, failed.live)
+
+    async def sweep(self) -> int:
+        async with SessionLocal() as db:
+            result = await db.execute(
+                delete(OtpCode).where(OtpCode.expires_at < func.now())
+            )
+            await db.commit()
+        return result.rowcount
+
+
+@dataclass
+class _MemoryEntry:
+    code_hash: str
+    expires_at: datetime
+    attempts: int = 0
+
+
+class MemoryOtpStore:
+    """
+    In-process OTP store with the same interface as SqlOtpStore.
+
+    Every method runs without awaiting in between reads and writes, so
+    consume() is atomic on the event loop. `db` arguments are ignored.
+    """
+
+    def __init__(self):
+        self._entries: dict[tuple[str, str], _MemoryEntry] = {}
+
+    async def issue(
+        self,
+        db: Optional[AsyncSession],
+        channel: str,
+        target: str,
+        ttl_seconds: Optional[int] = None,
+    ) -> tuple[str, datetime]:
+        code = generate_code()
+        expires_at = datetime.now(timezone.utc) + timedelta(
+            seconds=ttl_seconds or OTP_TTL_SECONDS
+        )
+        self._entries[(channel, target)] = _MemoryEntry(
+            code_hash=_hash_code(channel, target, code), expires_at=expires_at
+        )
+        return code, expires_at
+
+    async def consume(
+        self, db: Optional[AsyncSession], channel: str, target: str, code: str
+    ) -> str:
+        entry = self._entries.get((channel, target))
+        if entry is None:
+            return OtpResult.NOT_FOUND
+
+        now = datetime.now(timezone.utc)
+        if (
+            entry.expires_at > now
+            and entry.attempts < OTP_MAX_ATTEMPTS
+            and hmac.compare_digest(entry.code_hash, _hash_code(channel, target, code))
+        ):
+            del self._entries[(channel, target)]
+            return OtpResult.OK
+
+        entry.attempts += 1
+        return _failure(entry.attempts, entry.expires_at > now)
+
+    async def sweep(self) -> int:
+        now = datetime.now(timezone.utc)
+        expired = [key for key, e in self._entries.items() if e.expires_at < now]
+        for key in expired:
+            del self._entries[key]
+        return len(expired)
+
+
+async def run_otp_sweeper(store, interval: Optional[float] = None) -> None:
+    """
+    Delete expired codes forever; meant to run as a background task.
+    """
+    interval = interval or OTP_SWEEP_SECONDS
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            removed = await store.sweep()
+            if removed:
+                logger.info("Swept %s expired OTP codes", removed)
+        except Exception:
+            logger.exception("OTP sweep failed")
+
+
+otp_store = MemoryOtpStore() if OTP_BACKEND == "memory" else SqlOtpStore()
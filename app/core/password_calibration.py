@@ -0,0 +1,88 @@
+"""
+Pick the bcrypt cost for this host from measurements.
+
+    python -m app.core.password_calibration [--target-ms 250] [--workers N]
+
+Times the same SHA-256 + bcrypt hash the app uses at increasing cost
+factors and recommends the highest BCRYPT_ROUNDS whose median hash time
+stays within --target-ms. Each extra round doubles the time, so the
+table also shows what every cost means for login capacity: one hash per
+login, per core, and for the whole host with --workers password-pool
+processes (default: CPUs available).
+
+Run it on the production instance type; laptops and CI runners are not
+representative.
+"""
+
+import argparse
+import os
+import statistics
+import time
+
+import bcrypt
+
+from app.core.security import BCRYPT_PREFIX, BCRYPT_ROUNDS, _normalize_password
+
+
+def time_hash(rounds: int, samples: int) -> float:
+    """Median seconds for one hash at `rounds`."""
+    normalized = _normalize_password("calibration-password")
+    timings = []
+    for _ in range(samples):
+        salt = bcrypt.gensalt(rounds=rounds, prefix=BCRYPT_PREFIX.encode())
+        start = time.perf_counter()
+        bcrypt.hashpw(normalized, salt)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def calibrate(
+    target_seconds: float, min_rounds: int, max_rounds: int, samples: int
+) -> list[tuple[int, float]]:
+    """
+    (rounds, median seconds) from min_rounds up; stops after the first
+    cost that exceeds the target, since every further one is twice as slow.
+    """
+    results = []
+    for rounds in range(min_rounds, max_rounds + 1):
+        seconds = time_hash(rounds, samples)
+        results.append((rounds, seconds))
+        if seconds > target_seconds:
+            break
+    return results
+
+
+def recommend(results: list[tuple[int, float]], target_seconds: float) -> int:
+    within = [rounds for rounds, seconds in results if seconds <= target_seconds]
+    return max(within) if within else results[0][0]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--target-ms", type=float, default=250)
+    parser.add_argument("--min-rounds", type=int, default=10)
+    parser.add_argument("--max-rounds", type=int, default=16)
+    parser.add_argument("--samples", type=int, default=5)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    target = args.target_ms / 1000
+    results = calibrate(target, args.min_rounds, args.max_rounds, args.samples)
+    best = recommend(results, target)
+
+    print(f"{'rounds':>6} {'hash ms':>9} {'logins/s/core':>14} {'logins/s/host':>14}")
+    for rounds, seconds in results:
+        marker = "  <- recommended" if rounds == best else ""
+        if rounds == BCRYPT_ROUNDS:
+            marker += "  (current)"
+        print(
+            f"{rounds:>6} {seconds * 1000:>9.1f} {1 / seconds:>14.1f} "
+            f"{args.workers / seconds:>14.1f}{marker}"
+        )
+    print(f"\nBCRYPT_ROUNDS={best}")
+    if results[0][1] > target:
+        print(f"note: even {args.min_rounds} rounds exceed {args.target_ms:g} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+import asyncio
+import multiprocessing
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Optional
+
+from fastapi import HTTPException, status
+
+from app.core import metrics
+from app.core.security import hash_password, hash_passwords, verify_password
+
+# 🔹 Password pool config from env
+# "process": bcrypt runs in worker processes (scales across cores).
+# "thread": bcrypt releases the GIL, so a thread pool also runs in parallel
+#           and avoids process start-up cost.
+PASSWORD_POOL_KIND = os.getenv("PASSWORD_POOL_KIND", "process")
+PASSWORD_POOL_SIZE = int(os.getenv("PASSWORD_POOL_SIZE", str(os.cpu_count() or 1)))
+PASSWORD_POOL_MAX_QUEUE = int(os.getenv("PASSWORD_POOL_MAX_QUEUE", "64"))
+PASSWORD_POOL_RETRY_AFTER = int(os.getenv("PASSWORD_POOL_RETRY_AFTER", "1"))
+
+_executor: Optional[Executor] = None
+_in_flight = 0
+
+
+def _get_executor() -> Executor:
+    global _executor
+    if _executor is None:
+        if PASSWORD_POOL_KIND == "thread":
+            _executor = ThreadPoolExecutor(
+                max_workers=PASSWORD_POOL_SIZE, thread_name_prefix="password"
+            )
+        else:
+            # spawn: never fork a process that holds DB connections / loop state
+            _executor = ProcessPoolExecutor(
+                max_workers=PASSWORD_POOL_SIZE,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+    return _executor
+
+
+def _reset_after_fork() -> None:
+    # the parent's executor (its workers, queues and threads) is unusable in
+    # a forked child; the child starts its own on first use
+    global _executor, _in_flight
+    _executor, _in_flight = None, 0
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def _timed(fn, *args):
+    # runs in the worker: report bcrypt time separately from queueing
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+async def _run_in_pool(op: str, fn, *args):
+    """
+    Run a bcrypt call on the password pool without blocking the event loop.
+
+    Jobs beyond PASSWORD_POOL_SIZE running + PASSWORD_POOL_MAX_QUEUE waiting
+    are rejected with 503 + Retry-After instead of queueing forever.
+    """
+    global _in_flight
+    if _in_flight >= PASSWORD_POOL_SIZE + PASSWORD_POOL_MAX_QUEUE:
+        metrics.password_pool_rejected_total.inc(op)
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Server is busy, please retry later",
+            headers={"Retry-After": str(PASSWORD_POOL_RETRY_AFTER)},
+        )
+
+    _in_flight += 1
+    start = time.perf_counter()
+    try:
+        loop = asyncio.get_running_loop()
+        result, elapsed = await loop.run_in_executor(_get_executor(), _timed, fn, *args)
+    finally:
+        _in_flight -= 1
+    metrics.password_hash_duration_seconds.observe(elapsed, op)
+    metrics.password_pool_wait_seconds.observe(
+        max(time.perf_counter() - start - elapsed, 0.0), op
+    )
+    return result
+
+
+async def hash_password_in_pool(password: str) -> str:
+    return await _run_in_pool("hash", hash_password, password)
+
+
+async def verify_password_in_pool(plain_password: str, hashed_password: str) -> bool:
+    return await _run_in_pool(
+        "verify", verify_password, plain_password, hashed_password
+    )
+
+
+async def hash_passwords_in_pool(
+    passwords: list[str], chunk_size: int, max_jobs: int
+) -> list[str]:
+    """
+    Hash many passwords, `chunk_size` per pool job and at most `max_jobs`
+    jobs at once, so interactive hashes still find a free worker between
+    chunks. Bulk work waits for queue space instead of failing with 503.
+    """
+    semaphore = asyncio.Semaphore(max_jobs)
+
+    async def run_chunk(chunk: list[str]) -> list[str]:
+        async with semaphore:
+            while True:
+                try:
+                    return await _run_in_pool("hash_batch", hash_passwords, chunk)
+                except HTTPException as e:
+                    if e.status_code != status.HTTP_503_SERVICE_UNAVAILABLE:
+                        raise
+                    await asyncio.sleep(PASSWORD_POOL_RETRY_AFTER)
+
+    chunks = [
+        passwords[start : start + chunk_size]
+        for start in range(0, len(passwords), chunk_size)
+    ]
+    results = await asyncio.gather(*(run_chunk(chunk) for chunk in chunks))
+    return [hashed for chunk in results for hashed in chunk]
+
+
+async def warm_password_pool() -> None:
+    """
+    Start every pool worker now, with one real hash each, instead of on the
+    first logins after a deploy (a spawned worker has to import bcrypt and
+    the app's security module before its first job).
+    """
+    loop = asyncio.get_running_loop()
+    executor = _get_executor()
+    await asyncio.gather(
+        *(
+            loop.run_in_executor(executor, hash_password, "warm-up")
+            for _ in range(PASSWORD_POOL_SIZE)
+        )
+    )
+
+
+metrics.password_pool_in_flight.set_function(lambda: {(): _in_flight})
+
+
+def shutdown_password_pool() -> None:
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
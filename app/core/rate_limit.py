@@ -0,0 +1,222 @@
+import logging
+import math
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+
+from fastapi import HTTPException, Request, status
+
+logger = logging.getLogger(__name__)
+
+# 🔹 Rate limit config from env
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+RATE_LIMIT_SHARDS = int(os.getenv("RATE_LIMIT_SHARDS", "16"))
+RATE_LIMIT_MAX_KEYS_PER_SHARD = int(os.getenv("RATE_LIMIT_MAX_KEYS_PER_SHARD", "10000"))
+# optional shared backend so limits hold across workers/instances
+RATE_LIMIT_REDIS_URL = os.getenv("RATE_LIMIT_REDIS_URL")
+# only behind a trusted proxy: take the client IP from X-Forwarded-For
+RATE_LIMIT_TRUST_FORWARDED = (
+    os.getenv("RATE_LIMIT_TRUST_FORWARDED", "false").lower() == "true"
+)
+
+
+@dataclass(frozen=True)
+class Rate:
+    """
+    Token bucket parameters: `capacity` requests per `period` seconds,
+    with bursts of up to `capacity`.
+    """
+
+    capacity: float
+    period: float
+
+    @property
+    def refill_per_second(self) -> float:
+        return self.capacity / self.period
+
+    @classmethod
+    def parse(cls, spec: Optional[str]) -> Optional["Rate"]:
+        """'10/60' -> 10 requests per 60 seconds; '' / 'off' -> no limit."""
+        if not spec or spec.lower() == "off":
+            return None
+        count, _, period = spec.partition("/")
+        return cls(capacity=float(count), period=float(period or 1))
+
+
+class _Bucket:
+    __slots__ = ("tokens", "updated")
+
+    def __init__(self, tokens: float, updated: float):
+        self.tokens = tokens
+        self.updated = updated
+
+
+class MemoryBackend:
+    """
+    In-process token buckets, split across shards.
+
+    Each shard is an LRU-bounded dict, so a flood of distinct keys (e.g.
+    random emails) evicts old buckets instead of growing memory forever,
+    and one hot shard never forces a scan of all keys.
+    """
+
+    def __init__(self, shards: int, max_keys_per_shard: int):
+        self._shards = [OrderedDict() for _ in range(shards)]
+        self.max_keys_per_shard = max_keys_per_shard
+
+    async def acquire(self, key: str, rate: Rate, cost: float = 1) -> float:
+        """
+        Take `cost` tokens. Returns 0 if allowed, else seconds to wait.
+        """
+        shard = self._shards[hash(key) % len(self._shards)]
+        now = time.monotonic()
+
+        bucket = shard.get(key)
+        if bucket is None:
+            bucket = _Bucket(rate.capacity, now)
+            shard[key] = bucket
+            if len(shard) > self.max_keys_per_shard:
+                shard.popitem(last=False)
+        else:
+            shard.move_to_end(key)
+            bucket.tokens = min(
+                rate.capacity,
+                bucket.tokens + (now - bucket.updated) * rate.refill_per_second,
+            )
+            bucket.updated = now
+
+        if bucket.tokens >= cost:
+            bucket.tokens -= cost
+            return 0.0
+        return (cost - bucket.tokens) / rate.refill_per_second
+
+
+_REDIS_TOKEN_BUCKET = """
+local capacity = tonumber(ARGV[1])
+local refill = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local b = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(b[1]) or capacity
+local updated = tonumber(b[2]) or now
+tokens = math.min(capacity, tokens + (now - updated) * refill)
+local wait = 0
+if tokens >= cost then
+  tokens = tokens - cost
+else
+  wait = (cost - tokens) / refill
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'updated', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / refill) + 1)
+return tostring(wait)
+"""
+
+
+class RedisBackend:
+    """
+    Shared token buckets in Redis (one atomic Lua script per check).
+    Requires the optional `redis` package.
+    """
+
+    def __init__(self, url: str):
+        import redis.asyncio as redis
+
+        self._redis = redis.from_url(url)
+        self._script = self._redis.register_script(_REDIS_TOKEN_BUCKET)
+
+    async def acquire(self, key: str, rate: Rate, cost: float = 1) -> float:
+        wait = await self._script(
+            keys=[f"ratelimit:{key}"],
+            args=[rate.capacity, rate.refill_per_second, cost],
+        )
+        return float(wait)
+
+
+memory_backend = MemoryBackend(RATE_LIMIT_SHARDS, RATE_LIMIT_MAX_KEYS_PER_SHARD)
+shared_backend = RedisBackend(RATE_LIMIT_REDIS_URL) if RATE_LIMIT_REDIS_URL else None
+
+
+def _client_ip(request: Request) -> str:
+    if RATE_LIMIT_TRUST_FORWARDED:
+        forwarded = request.headers.get("x-forwarded-for")
+        if forwarded:
+            return forwarded.split(",")[0].strip()
+    return request.client.host if request.client else "unknown"
+
+
+def _env_rate(action: str, scope: str, default: Optional[str]) -> Optional[Rate]:
+    # e.g. RATE_LIMIT_EMAIL_LOGIN_IP=20/60, RATE_LIMIT_EMAIL_LOGIN_GLOBAL=off
+    return Rate.parse(os.getenv(f"RATE_LIMIT_{action.upper()}_{scope}", default))
+
+
+class RateLimit:
+    """
+    FastAPI dependency enforcing per-identity, per-IP and global token
+    buckets for one action, before any expensive work runs.
+
+    `identity_field` names a JSON body field (email / phone number) to
+    key the per-identity bucket on. Rejections are 429 with Retry-After.
+
+        @router.post(..., dependencies=[Depends(RateLimit("email_login", ...))])
+    """
+
+    def __init__(
+        self,
+        action: str,
+        per_identity: Optional[str] = None,
+        per_ip: Optional[str] = None,
+        global_: Optional[str] = None,
+        identity_field: Optional[str] = None,
+    ):
+        self.action = action
+        self.identity_field = identity_field
+        self.per_identity = _env_rate(action, "IDENTITY", per_identity)
+        self.per_ip = _env_rate(action, "IP", per_ip)
+        self.global_ = _env_rate(action, "GLOBAL", global_)
+
+    async def _identity(self, request: Request) -> Optional[str]:
+        if self.identity_field is None:
+            return None
+        try:
+            # FastAPI has already read and cached the body at this point
+            body = await request.json()
+        except ValueError:
+            return None
+        value = body.get(self.identity_field) if isinstance(body, dict) else None
+        return str(value).strip().lower() if value else None
+
+    async def _acquire(self, key: str, rate: Rate) -> float:
+        if shared_backend is not None:
+            try:
+                return await shared_backend.acquire(key, rate)
+            except Exception:
+                logger.exception("Shared rate limit backend failed; using memory")
+        return await memory_backend.acquire(key, rate)
+
+    async def __call__(self, request: Request) -> None:
+        if not RATE_LIMIT_ENABLED:
+            return
+
+        # the per-identity bucket is charged last: a client throttled by IP
+        # (or the global limit) must not keep spending someone else's
+        # email / phone number tokens and lock its owner out
+        checks = []
+        if self.per_ip:
+            checks.append((f"{self.action}:ip:{_client_ip(request)}", self.per_ip))
+        if self.global_:
+            checks.append((f"{self.action}:global", self.global_))
+        identity = await self._identity(request)
+        if self.per_identity and identity:
+            checks.append((f"{self.action}:id:{identity}", self.per_identity))
+
+        for key, rate in checks:
+            wait = await self._acquire(key, rate)
+            if wait > 0:
+                raise HTTPException(
+                    status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                    detail="Too many requests, please retry later",
+                    headers={"Retry-After": str(max(1, math.ceil(wait)))},
+                )
@@ -0,0 +1,31 @@
+"""
+Fast JSON responses for the hot auth routes.
+
+FastAPI's default path validates the returned dict against the
+response_model, dumps it to JSON-able Python primitives and then runs
+json.dumps over those. For token responses we skip the intermediate
+objects: the ORM row is validated into the pydantic model in one pass and
+pydantic-core's serializer, compiled once at import, writes the JSON
+bytes directly.
+
+Every other route uses ORJSONResponse as the app's default response class.
+"""
+
+from fastapi import Response
+from pydantic import TypeAdapter
+
+from app.schemas.user import TokenResponse
+
+_token_serializer = TypeAdapter(TokenResponse)
+
+
+def token_response(access_token: str, user) -> Response:
+    """
+    `user` is a User row (or anything with the UserResponse attributes).
+    """
+    body = _token_serializer.validate_python(
+        {"access_token": access_token, "token_type": "Bearer", "user": user}
+    )
+    return Response(
+        content=_token_serializer.dump_json(body), media_type="application/json"
+    )
@@ -0,0 +1,98 @@
+import asyncio
+import logging
+import os
+from datetime import timedelta
+from typing import Optional
+from uuid import UUID
+
+from sqlalchemy import func, or_, select
+
+from app.db import SessionLocal
+from app.models.user import User
+
+logger = logging.getLogger(__name__)
+
+# 🔹 Revocation config from env
+REVOCATION_REFRESH_SECONDS = float(os.getenv("REVOCATION_REFRESH_SECONDS", "30"))
+# re-read rows this far behind the last watermark so updates that committed
+# late (updated_at is set at statement time, not commit time) are not missed
+REVOCATION_OVERLAP_SECONDS = float(os.getenv("REVOCATION_OVERLAP_SECONDS", "60"))
+
+
+class RevocationList:
+    """
+    Versioned deny-set for claims-carrying access tokens.
+
+    Holds only users that can invalidate a token:
+    - deactivated users (every token is rejected)
+    - users whose token_version was bumped (older tokens are rejected)
+
+    The first refresh loads that set in full; later refreshes only read rows
+    whose updated_at moved past the previous watermark.
+    """
+
+    def __init__(self):
+        self._min_version: dict[UUID, int] = {}
+        self._inactive: set[UUID] = set()
+        self._watermark = None
+        self.loaded = False
+
+    def is_revoked(self, user_uuid: UUID, token_version: int) -> bool:
+        if user_uuid in self._inactive:
+            return True
+        return token_version < self._min_version.get(user_uuid, 0)
+
+    def apply(self, user_uuid: UUID, token_version: int, is_active: bool) -> None:
+        """
+        Record the current state of one user (also used for local,
+        immediate revocation after a write in this worker).
+        """
+        if is_active:
+            self._inactive.discard(user_uuid)
+        else:
+            self._inactive.add(user_uuid)
+
+        if token_version > 0:
+            self._min_version[user_uuid] = token_version
+        else:
+            self._min_version.pop(user_uuid, None)
+
+    async def refresh(self) -> None:
+        async with SessionLocal() as db:
+            db_now = await db.scalar(select(func.now()))
+            stmt = select(User.uuid, User.token_version, User.is_active)
+            if self._watermark is None:
+                stmt = stmt.where(
+                    or_(User.is_active.is_(False), User.token_version > 0)
+                )
+            else:
+                stmt = stmt.where(User.updated_at >= self._watermark)
+            rows = (await db.execute(stmt)).all()
+
+        for user_uuid, token_version, is_active in rows:
+            self.apply(user_uuid, token_version, is_active)
+
+        self._watermark = db_now - timedelta(seconds=REVOCATION_OVERLAP_SECONDS)
+        self.loaded = True
+
+    async def run(self, interval: Optional[float] = None) -> None:
+        """
+        Refresh forever; meant to run as a background task from lifespan.
+        """
+        interval = interval or REVOCATION_REFRESH_SECONDS
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.refresh()
+            except Exception:
+                logger.exception("Failed to refresh token revocation list")
+
+    def stats(self) -> dict:
+        return {
+            "inactive": len(self._inactive),
+            "versioned": len(self._min_version),
+            "loaded": self.loaded,
+        }
+
+
+revocation_list = RevocationList()
@@ -0,0 +1,57 @@
+import logging
+import os
+from pathlib import Path
+from typing import Optional
+
+from alembic.config import Config
+from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+logger = logging.getLogger(__name__)
+
+# 🔹 Schema check config from env
+# "strict": refuse to start unless the DB is at the Alembic head
+# "warn":   log and start anyway
+# "off":    skip the check (e.g. when migrations run as a separate job)
+SCHEMA_CHECK = os.getenv("SCHEMA_CHECK", "strict")
+
+ALEMBIC_INI = Path(__file__).resolve().parents[1] / "alembic.ini"
+
+
+class SchemaOutOfDateError(RuntimeError):
+    pass
+
+
+def expected_head() -> str:
+    return ScriptDirectory.from_config(Config(str(ALEMBIC_INI))).get_current_head()
+
+
+def _current_revision(sync_conn) -> Optional[str]:
+    return MigrationContext.configure(sync_conn).get_current_revision()
+
+
+async def check_schema(engine: AsyncEngine, mode: str = SCHEMA_CHECK) -> None:
+    """
+    Compare the database's alembic_version with the migration head.
+
+    One indexed single-row read, instead of reflecting every table the
+    way Base.metadata.create_all does on each worker start. Migrations
+    are applied out of band: `alembic -c app/alembic.ini upgrade head`.
+    """
+    if mode == "off":
+        return
+
+    head = expected_head()
+    async with engine.connect() as conn:
+        current = await conn.run_sync(_current_revision)
+    if current == head:
+        return
+
+    message = (
+        f"Database schema is at {current or 'no revision'}, expected {head}; "
+        f"run `alembic -c app/alembic.ini upgrade head`"
+    )
+    if mode == "strict":
+        raise SchemaOutOfDateError(message)
+    logger.warning(message)
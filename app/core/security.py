@@ -2,12 +2,11 @@ import os
 from datetime import datetime, timedelta, timezone
 from typing import Optional
 
-from dotenv import load_dotenv
 from jose import jwt
 import bcrypt
 import hashlib
 
-load_dotenv()
+from app.core import config  # noqa: F401  (loads .env)
 
 # 🔹 JWT config from env
 JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY", "dev-secret")
@@ -15,6 +14,14 @@ JWT_ALGORITHM = os.getenv("JWT_ALGORITHM", "HS256")
 JWT_ACCESS_TOKEN_EXPIRE_MINUTES = int(
     os.getenv("JWT_ACCESS_TOKEN_EXPIRE_MINUTES", "30")
 )
+# opt-in: embed role / is_active / token version so auth can skip the DB
+JWT_CLAIMS_TOKENS = os.getenv("JWT_CLAIMS_TOKENS", "false").lower() == "true"
+
+# 🔹 Password hashing config from env
+# bcrypt cost factor (2^rounds iterations); pick it for this hardware with
+# `python -m app.core.password_calibration`
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+BCRYPT_PREFIX = "2b"
 
 
 def _normalize_password(password: str) -> bytes:
@@ -46,7 +53,7 @@ def hash_password(password: str) -> str:
     Hash a plain password using SHA-256 + bcrypt.
 
     1) Normalize password with SHA-256 (fix length).
-    2) Generate a random salt with bcrypt.gensalt().
+    2) Generate a random salt with bcrypt.gensalt(BCRYPT_ROUNDS).
     3) Hash the normalized password with that salt.
     4) Return the final bcrypt hash as a UTF-8 string for storage in DB.
     """
@@ -54,7 +61,7 @@ def hash_password(password: str) -> str:
     normalized = _normalize_password(password)  # bytes
 
     # 2) Salt generation (cost factor inside gensalt)
-    salt = bcrypt.gensalt()
+    salt = bcrypt.gensalt(rounds=BCRYPT_ROUNDS, prefix=BCRYPT_PREFIX.encode())
 
     # 3) bcrypt.hashpw(secret_bytes, salt) -> hash bytes
     hashed = bcrypt.hashpw(normalized, salt)
@@ -63,6 +70,14 @@ def hash_password(password: str) -> str:
     return hashed.decode("utf-8")
 
 
+def hash_passwords(passwords: list[str]) -> list[str]:
+    """
+    Hash several passwords in one call, so bulk jobs (user import) pay the
+    password pool's dispatch overhead once per chunk instead of per password.
+    """
+    return [hash_password(password) for password in passwords]
+
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """
     Verify a plain password against a stored bcrypt hash.
@@ -82,6 +97,21 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     return bcrypt.checkpw(normalized, hashed_bytes)
 
 
+def needs_rehash(hashed_password: str) -> bool:
+    """
+    True if a stored hash was made with another bcrypt variant or cost
+    than the current settings ("$2b$12$<salt+hash>" -> variant 2b, cost 12).
+
+    Only the bcrypt parameters change on rehash; the SHA-256 normalization
+    step is the same for every hash, so old and new hashes verify alike.
+    """
+    try:
+        _, prefix, rounds, _ = hashed_password.split("$", 3)
+        return prefix != BCRYPT_PREFIX or int(rounds) != BCRYPT_ROUNDS
+    except ValueError:
+        return True
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """
     Create a JWT access token with `data` as payload and an expiration.
@@ -103,7 +133,27 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
         )
 
     to_encode.update({"exp": expire})
-    print(to_encode)
 
     encoded_jwt = jwt.encode(to_encode, JWT_SECRET_KEY, algorithm=JWT_ALGORITHM)
     return encoded_jwt
+
+
+def create_user_access_token(user) -> str:
+    """
+    Create an access token for a user (ORM row or cached snapshot).
+
+    - Always carries "sub" (user UUID).
+    - With JWT_CLAIMS_TOKENS enabled it also carries "role", "is_active"
+      and "ver" (the user's token_version), which lets
+      `get_token_user` authenticate without loading the user row.
+    """
+    data = {"sub": str(user.uuid)}
+    if JWT_CLAIMS_TOKENS:
+        data.update(
+            {
+                "role": user.role,
+                "is_active": user.is_active,
+                "ver": user.token_version,
+            }
+        )
+    return create_access_token(data=data)
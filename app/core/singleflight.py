@@ -0,0 +1,101 @@
+"""
+Request coalescing ("singleflight") for duplicate provider calls.
+
+Mobile clients double-fire requests. With a SingleFlight in front of a
+call, concurrent callers with the same key share one in-flight call and
+its outcome (result or exception), and a successful result is reused for
+`dedupe_seconds` afterwards, so a retry right after completion doesn't
+hit the provider again either.
+
+Per worker process: duplicates landing on different workers still make
+separate calls; the database writes behind them stay atomic on their own.
+"""
+
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Hashable, TypeVar
+
+from app.core import metrics
+
+T = TypeVar("T")
+
+# 🔹 Singleflight config from env
+SINGLEFLIGHT_MAX_RECENT = int(os.getenv("SINGLEFLIGHT_MAX_RECENT", "10000"))
+# how long a finished OTP send / verification answers duplicates
+SINGLEFLIGHT_SEND_DEDUPE_SECONDS = float(
+    os.getenv("SINGLEFLIGHT_SEND_DEDUPE_SECONDS", "10")
+)
+# kept short: within it, the same phone + code verifies again
+SINGLEFLIGHT_VERIFY_DEDUPE_SECONDS = float(
+    os.getenv("SINGLEFLIGHT_VERIFY_DEDUPE_SECONDS", "5")
+)
+
+
+class SingleFlight:
+    """
+    Only touched from the event loop thread, so no locking is needed.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        dedupe_seconds: float,
+        max_recent: int = SINGLEFLIGHT_MAX_RECENT,
+    ):
+        self.name = name
+        self.dedupe_seconds = dedupe_seconds
+        self.max_recent = max_recent
+        self._in_flight: dict[Hashable, asyncio.Task] = {}
+        self._recent: "OrderedDict[Hashable, tuple[float, object]]" = OrderedDict()
+
+    def _recent_result(self, key: Hashable):
+        entry = self._recent.get(key)
+        if entry is None:
+            return None
+        expires_at, result = entry
+        if expires_at <= time.monotonic():
+            del self._recent[key]
+            return None
+        return entry
+
+    def _remember(self, key: Hashable, task: asyncio.Task) -> None:
+        self._in_flight.pop(key, None)
+        if self.dedupe_seconds <= 0 or task.cancelled() or task.exception():
+            return
+        self._recent[key] = (time.monotonic() + self.dedupe_seconds, task.result())
+        self._recent.move_to_end(key)
+        while len(self._recent) > self.max_recent:
+            self._recent.popitem(last=False)
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        """
+        Run `fn()` unless an identical call is in flight or just finished.
+
+        The call runs as its own task, shielded from each caller: a client
+        that disconnects stops waiting, but doesn't cancel the call for
+        the others sharing it.
+        """
+        recent = self._recent_result(key)
+        if recent is not None:
+            metrics.singleflight_shared_total.inc(self.name, "recent")
+            return recent[1]
+
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.create_task(fn())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda done: self._remember(key, done))
+        else:
+            metrics.singleflight_shared_total.inc(self.name, "in_flight")
+        return await asyncio.shield(task)
+
+    def forget(self, key: Hashable) -> None:
+        """
+        Drop a finished result early, e.g. once the OTP it sent is used up.
+        """
+        self._recent.pop(key, None)
+
+    def stats(self) -> dict:
+        return {"in_flight": len(self._in_flight), "recent": len(self._recent)}
@@ -0,0 +1,165 @@
+"""
+Per-request SQL profiling built on SQLAlchemy cursor events.
+
+For a sampled request it records the query count, total DB time and the
+slowest statements, flags statements repeated within the request (the
+N+1 / redundant round trip pattern) and reports the totals in a
+`Server-Timing` header, which browser dev tools and most APM agents show.
+
+Off by default. With SQL_PROFILER_ENABLED=true, requests are sampled at
+SQL_PROFILER_SAMPLE_RATE, and any request sent with `X-SQL-Profile: 1`
+is always profiled.
+"""
+
+import heapq
+import logging
+import os
+import random
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+logger = logging.getLogger(__name__)
+
+# 🔹 SQL profiler config from env
+SQL_PROFILER_ENABLED = os.getenv("SQL_PROFILER_ENABLED", "false").lower() == "true"
+SQL_PROFILER_SAMPLE_RATE = float(os.getenv("SQL_PROFILER_SAMPLE_RATE", "0.01"))
+SQL_PROFILER_TOP_STATEMENTS = int(os.getenv("SQL_PROFILER_TOP_STATEMENTS", "3"))
+# same statement this many times in one request -> flagged as N+1
+SQL_PROFILER_REPEAT_THRESHOLD = int(os.getenv("SQL_PROFILER_REPEAT_THRESHOLD", "3"))
+# requests with more DB time than this are logged even without flags
+SQL_PROFILER_SLOW_MS = float(os.getenv("SQL_PROFILER_SLOW_MS", "100"))
+
+FORCE_HEADER = b"x-sql-profile"
+
+
+class RequestProfile:
+    __slots__ = (
+        "query_count",
+        "total_seconds",
+        "statements",
+        "slowest",
+        "_params_seen",
+    )
+
+    def __init__(self):
+        self.query_count = 0
+        self.total_seconds = 0.0
+        # statement text -> [executions, identical (same params) repeats, seconds]
+        self.statements: dict[str, list] = {}
+        self._params_seen: set[tuple[str, str]] = set()
+        self.slowest: list[tuple[float, str]] = []
+
+    def record(self, statement: str, parameters, seconds: float) -> None:
+        self.query_count += 1
+        self.total_seconds += seconds
+
+        entry = self.statements.get(statement)
+        if entry is None:
+            entry = self.statements[statement] = [0, 0, 0.0]
+        entry[0] += 1
+        entry[2] += seconds
+        key = (statement, repr(parameters))
+        if key in self._params_seen:
+            entry[1] += 1
+        else:
+            self._params_seen.add(key)
+
+        item = (seconds, statement)
+        if len(self.slowest) < SQL_PROFILER_TOP_STATEMENTS:
+            heapq.heappush(self.slowest, item)
+        else:
+            heapq.heappushpop(self.slowest, item)
+
+    def repeated(self) -> list[tuple[str, int, int]]:
+        """(statement, executions, identical repeats) above the threshold."""
+        return [
+            (statement, count, identical)
+            for statement, (count, identical, _) in self.statements.items()
+            if count >= SQL_PROFILER_REPEAT_THRESHOLD or identical
+        ]
+
+    def server_timing(self) -> str:
+        return (
+            f'db;dur={self.total_seconds * 1000:.1f};desc="{self.query_count} queries"'
+        )
+
+
+_current: ContextVar[Optional[RequestProfile]] = ContextVar("sql_profile", default=None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        # per-execution, so a statement that fails never leaves a stale start
+        context._sql_profiler_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    profile = _current.get()
+    start = getattr(context, "_sql_profiler_start", None)
+    if profile is not None and start is not None:
+        profile.record(statement, parameters, time.perf_counter() - start)
+
+
+def install(engine: AsyncEngine) -> None:
+    """
+    Attach the cursor listeners. Cursor events fire inside SQLAlchemy's
+    asyncio greenlet, which runs in the request's context, so the
+    contextvar set by the middleware is visible there.
+    """
+    event.listen(engine.sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine.sync_engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def _log(method: str, path: str, profile: RequestProfile) -> None:
+    repeated = profile.repeated()
+    if not repeated and profile.total_seconds * 1000 < SQL_PROFILER_SLOW_MS:
+        return
+    lines = [
+        f"SQL profile {method} {path}: {profile.query_count} queries, "
+        f"{profile.total_seconds * 1000:.1f} ms"
+    ]
+    for statement, count, identical in repeated:
+        lines.append(f"  repeated x{count} ({identical} identical): {statement[:200]}")
+    for seconds, statement in sorted(profile.slowest, reverse=True):
+        lines.append(f"  slow {seconds * 1000:.1f} ms: {statement[:200]}")
+    logger.warning("\n".join(lines))
+
+
+class SqlProfilerMiddleware:
+    """
+    Pure ASGI middleware: picks the requests to profile and reports them.
+    """
+
+    def __init__(self, app, sample_rate: float = SQL_PROFILER_SAMPLE_RATE):
+        self.app = app
+        self.sample_rate = sample_rate
+
+    def _sampled(self, scope) -> bool:
+        for name, value in scope["headers"]:
+            if name == FORCE_HEADER:
+                return value == b"1"
+        return random.random() < self.sample_rate
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._sampled(scope):
+            return await self.app(scope, receive, send)
+
+        profile = RequestProfile()
+        token = _current.set(profile)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", profile.server_timing().encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(token)
+            _log(scope["method"], scope["path"], profile)
@@ -0,0 +1,47 @@
+import logging
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+
+class StartupReport:
+    """
+    Wall time of each boot phase, from the first app import until the
+    lifespan hands over to the server. Import this module before any
+    other app module so "imports" covers them all.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases: dict[str, float] = {}
+        self.total = None
+
+    def imports_done(self) -> None:
+        self.phases["imports"] = time.perf_counter() - self.started
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = time.perf_counter() - start
+
+    def finish(self) -> None:
+        self.total = time.perf_counter() - self.started
+        logger.info(
+            "Startup finished in %.0f ms (%s)",
+            self.total * 1000,
+            ", ".join(f"{k} {v * 1000:.0f} ms" for k, v in self.phases.items()),
+        )
+
+    def as_dict(self) -> dict:
+        return {
+            "ready": self.total is not None,
+            "total_ms": round(self.total * 1000, 1) if self.total else None,
+            "phases_ms": {k: round(v * 1000, 1) for k, v in self.phases.items()},
+        }
+
+
+startup_report = StartupReport()
@@ -0,0 +1,118 @@
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+from uuid import UUID
+
+from app.models.user import User
+
+# 🔹 User cache config from env (TTL 0 disables caching)
+USER_CACHE_MAX_SIZE = int(os.getenv("USER_CACHE_MAX_SIZE", "10000"))
+USER_CACHE_TTL_SECONDS = float(os.getenv("USER_CACHE_TTL_SECONDS", "60"))
+
+
+@dataclass(frozen=True, slots=True)
+class CachedUser:
+    """
+    Detached, read-only snapshot of a `users` row.
+
+    Safe to share between requests: it is not bound to any session and
+    carries no secrets (password hash, OTP codes).
+    """
+
+    id: int
+    uuid: UUID
+    email: Optional[str]
+    phone_number: Optional[str]
+    auth_provider: str
+    role: str
+    is_active: bool
+    is_phone_verified: bool
+    is_email_verified: bool
+    token_version: int
+
+    @classmethod
+    def from_user(cls, user: User) -> "CachedUser":
+        return cls(
+            id=user.id,
+            uuid=user.uuid,
+            email=user.email,
+            phone_number=user.phone_number,
+            auth_provider=user.auth_provider,
+            role=user.role,
+            is_active=user.is_active,
+            is_phone_verified=user.is_phone_verified,
+            is_email_verified=user.is_email_verified,
+            token_version=user.token_version,
+        )
+
+
+class UserCache:
+    """
+    LRU + TTL cache of `CachedUser` snapshots keyed by user UUID.
+
+    Only touched from the event loop thread, so no locking is needed.
+    """
+
+    def __init__(self, max_size: int, ttl_seconds: float):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[UUID, tuple[float, CachedUser]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0 and self.ttl_seconds > 0
+
+    def get(self, user_uuid: UUID) -> Optional[CachedUser]:
+        entry = self._entries.get(user_uuid)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        expires_at, user = entry
+        if expires_at <= time.monotonic():
+            del self._entries[user_uuid]
+            self.expirations += 1
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(user_uuid)
+        self.hits += 1
+        return user
+
+    def put(self, user: CachedUser) -> None:
+        if not self.enabled:
+            return
+        self._entries[user.uuid] = (time.monotonic() + self.ttl_seconds, user)
+        self._entries.move_to_end(user.uuid)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, user_uuid: UUID) -> None:
+        if self._entries.pop(user_uuid, None) is not None:
+            self.invalidations += 1
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+        }
+
+
+user_cache = UserCache(USER_CACHE_MAX_SIZE, USER_CACHE_TTL_SECONDS)
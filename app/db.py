@@ -1,22 +1,368 @@
+import itertools
+import logging
 import os
-from dotenv import load_dotenv
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Hashable, Optional
 
-load_dotenv(override=True)
+from sqlalchemy import Select, exc
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
+from sqlalchemy.orm import Session, declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from app.core import config  # noqa: F401  (loads .env)
+from app.core import metrics
+
+logger = logging.getLogger(__name__)
 
 SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL")
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL, echo=True)
+# 🔹 Pool config from env
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_ECHO = os.getenv("DB_ECHO", "false").lower() == "true"
+
+# 🔹 Read replica config from env (comma-separated; same pool settings each)
+DATABASE_REPLICA_URLS = [
+    url.strip()
+    for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",")
+    if url.strip()
+]
+# how long a replica that failed stays out of rotation, unless the health
+# prober sees it answer again first
+DB_REPLICA_RETRY_SECONDS = float(os.getenv("DB_REPLICA_RETRY_SECONDS", "30"))
+# how long a user's reads go to the primary after their own write; should
+# cover the usual replication lag
+DB_REPLICA_STICKY_SECONDS = float(os.getenv("DB_REPLICA_STICKY_SECONDS", "5"))
+# an unreachable replica fails this fast, so reads move on to another one
+DB_REPLICA_CONNECT_TIMEOUT_SECONDS = float(
+    os.getenv("DB_REPLICA_CONNECT_TIMEOUT_SECONDS", "1")
+)
+
+# sync driver -> async driver for the same backend
+_ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+
+def to_async_url(database_url: str):
+    """
+    Accept the same DATABASE_URL Alembic uses (e.g. postgresql+psycopg2://...)
+    and swap the driver for its asyncio counterpart.
+    """
+    url = make_url(database_url)
+    backend = url.get_backend_name()
+    if url.get_driver_name() in ("asyncpg", "aiosqlite"):
+        return url
+    return url.set(drivername=_ASYNC_DRIVERS.get(backend, url.drivername))
+
+
+class InstrumentedAsyncPool(AsyncAdaptedQueuePool):
+    """
+    Queue pool that records how long each checkout waited for a
+    connection (the time a request spends blocked on pool exhaustion).
+    """
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            metrics.db_pool_checkout_timeouts_total.inc()
+            raise
+        finally:
+            metrics.db_pool_checkout_wait_seconds.observe(time.perf_counter() - start)
+
+
+def _engine_kwargs(url) -> dict:
+    kwargs = {"echo": DB_ECHO, "pool_pre_ping": True}
+    # SQLite uses a static/single-connection pool; sizing options don't apply
+    if url.get_backend_name() != "sqlite":
+        kwargs.update(
+            poolclass=InstrumentedAsyncPool,
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+            pool_recycle=DB_POOL_RECYCLE,
+        )
+    return kwargs
+
+
+_async_url = to_async_url(SQLALCHEMY_DATABASE_URL)
+
+engine = create_async_engine(_async_url, **_engine_kwargs(_async_url))
+
+
+def _replica_engine(url) -> AsyncEngine:
+    kwargs = _engine_kwargs(url)
+    if url.get_backend_name() == "postgresql":
+        kwargs["connect_args"] = {"timeout": DB_REPLICA_CONNECT_TIMEOUT_SECONDS}
+    return create_async_engine(url, **kwargs)
+
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+replica_engines = [
+    _replica_engine(url) for url in map(to_async_url, DATABASE_REPLICA_URLS)
+]
+
+
+def _dispose_after_fork() -> None:
+    # a forked child (gunicorn --preload, a fork in a script) must not share the
+    # parent's pooled sockets; close=False drops them without closing them
+    # under the parent
+    for db_engine in (engine, *replica_engines):
+        db_engine.sync_engine.dispose(close=False)
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_dispose_after_fork)
+
+
+def _engine_pool_stats(db_engine: AsyncEngine) -> dict:
+    pool = db_engine.pool
+    if not isinstance(pool, AsyncAdaptedQueuePool):
+        return {}
+    checked_out = pool.checkedout()
+    capacity = pool.size() + DB_MAX_OVERFLOW
+    return {
+        "size": pool.size(),
+        "max_overflow": DB_MAX_OVERFLOW,
+        "checked_out": checked_out,
+        "idle": pool.checkedin(),
+        "overflow": max(pool.overflow(), 0),
+        "utilization": round(checked_out / capacity, 3) if capacity else 0.0,
+    }
+
+
+def pool_stats() -> dict:
+    """
+    Current pool usage; empty for SQLite, which has no sized pool.
+    `utilization` is checked-out connections over size + max overflow.
+    Replica pools are listed under "replicas".
+    """
+    stats = _engine_pool_stats(engine)
+    if replica_engines:
+        stats["replicas"] = read_router.stats()
+    return stats
+
+
+def _pool_connections() -> dict:
+    stats = _engine_pool_stats(engine)
+    if not stats:
+        return {}
+    return {(state,): stats[state] for state in ("checked_out", "idle", "overflow")}
+
+
+metrics.db_pool_connections.set_function(_pool_connections)
+metrics.db_pool_size.set_function(
+    lambda: {(): engine.pool.size()} if hasattr(engine.pool, "size") else {}
+)
+
+# expire_on_commit=False: attributes stay loaded after commit, so handlers
+# don't trigger implicit (and, under asyncio, illegal) lazy refreshes.
+SessionLocal = async_sessionmaker(
+    bind=engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False,
+)
 
 Base = declarative_base()
 
 
-def get_db():
-    db = SessionLocal()
-    try:
+def _replica_name(replica: AsyncEngine) -> str:
+    url = replica.url
+    return f"{url.host or 'localhost'}:{url.port or ''}/{url.database}"
+
+
+class ReadRouter:
+    """
+    Picks the replica for each read session: round-robin over the replicas
+    not marked down, or None (use the primary) when none is left.
+
+    Also remembers recent writes per key (user uuid, email): for
+    DB_REPLICA_STICKY_SECONDS after `stick(key)`, reads for that key go to
+    the primary, so users see their own changes despite replication lag.
+    Like user_cache this is per worker process; reads that land on another
+    worker fall back to the primary when the row is missing (use_primary).
+    """
+
+    def __init__(
+        self,
+        replicas: list[AsyncEngine],
+        retry_seconds: float = DB_REPLICA_RETRY_SECONDS,
+        sticky_seconds: float = DB_REPLICA_STICKY_SECONDS,
+    ):
+        self.replicas = replicas
+        self.retry_seconds = retry_seconds
+        self.sticky_seconds = sticky_seconds
+        self._down_until: dict[AsyncEngine, float] = {}
+        self._turn = itertools.count()
+        self._sticky: "OrderedDict[Hashable, float]" = OrderedDict()
+
+    def is_up(self, replica: AsyncEngine, now: Optional[float] = None) -> bool:
+        return self._down_until.get(replica, 0.0) <= (now or time.monotonic())
+
+    def pick(self) -> Optional[AsyncEngine]:
+        now = time.monotonic()
+        start = next(self._turn)
+        for offset in range(len(self.replicas)):
+            replica = self.replicas[(start + offset) % len(self.replicas)]
+            if self.is_up(replica, now):
+                return replica
+        return None
+
+    def mark_down(self, replica: AsyncEngine) -> None:
+        if self.is_up(replica):
+            logger.warning("Read replica %s is down", _replica_name(replica))
+        self._down_until[replica] = time.monotonic() + self.retry_seconds
+
+    def mark_up(self, replica: AsyncEngine) -> None:
+        if self._down_until.pop(replica, None) is not None:
+            logger.info("Read replica %s is back", _replica_name(replica))
+
+    def stick(self, *keys: Hashable) -> None:
+        if not self.replicas:
+            return
+        now = time.monotonic()
+        for key in keys:
+            if key is not None:
+                self._sticky[key] = now + self.sticky_seconds
+                self._sticky.move_to_end(key)
+        # one TTL for all: the oldest entries are the first to expire
+        while self._sticky and next(iter(self._sticky.values())) <= now:
+            self._sticky.popitem(last=False)
+
+    def is_sticky(self, key: Hashable) -> bool:
+        expires_at = self._sticky.get(key)
+        return expires_at is not None and expires_at > time.monotonic()
+
+    def stats(self) -> list[dict]:
+        now = time.monotonic()
+        return [
+            {
+                "name": _replica_name(replica),
+                "up": self.is_up(replica, now),
+                **_engine_pool_stats(replica),
+            }
+            for replica in self.replicas
+        ]
+
+
+read_router = ReadRouter(replica_engines)
+
+# session.info keys used by RoutingSession
+_USE_PRIMARY = "use_primary"
+_REPLICA = "replica"
+
+
+def _is_plain_select(clause) -> bool:
+    return isinstance(clause, Select) and clause._for_update_arg is None
+
+
+class RoutingSession(Session):
+    """
+    Sync side of ReadSessionLocal. Plain SELECTs go to the replica picked
+    for this session; writes, locking reads and raw SQL go to the primary,
+    and so does everything after the first of them, so a session always
+    reads its own writes.
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        if not self.info.get(_USE_PRIMARY):
+            if self._flushing or not _is_plain_select(clause):
+                self.info[_USE_PRIMARY] = True
+            else:
+                if _REPLICA not in self.info:
+                    self.info[_REPLICA] = read_router.pick()
+                if self.info[_REPLICA] is not None:
+                    return self.info[_REPLICA].sync_engine
+        return engine.sync_engine
+
+
+ReadSessionLocal = async_sessionmaker(
+    class_=AsyncSession,
+    sync_session_class=RoutingSession,
+    autoflush=False,
+    expire_on_commit=False,
+)
+
+
+def _is_connection_error(error: Exception) -> bool:
+    # asyncpg raises OSError subclasses for refused connects, and
+    # TimeoutError (also an OSError) past DB_REPLICA_CONNECT_TIMEOUT_SECONDS
+    return isinstance(error, OSError) or getattr(error, "connection_invalidated", False)
+
+
+@asynccontextmanager
+async def read_session() -> AsyncIterator[AsyncSession]:
+    """
+    Session for read-mostly work: a plain SessionLocal session without
+    replicas; otherwise a RoutingSession, and a replica that fails to
+    answer is taken out of rotation for the following sessions.
+    """
+    if not replica_engines:
+        async with SessionLocal() as db:
+            yield db
+        return
+
+    async with ReadSessionLocal() as db:
+        try:
+            yield db
+        except Exception as e:
+            replica = db.info.get(_REPLICA)
+            if replica is not None and _is_connection_error(e):
+                read_router.mark_down(replica)
+            raise
+
+
+def use_primary(db: AsyncSession, key: Hashable = None) -> bool:
+    """
+    Send this read session's remaining queries to the primary: always, or
+    with `key` only if that key was written recently (read_router.stick).
+
+    Returns whether earlier queries ran on a replica, i.e. whether
+    re-running one that came back empty can give a different answer.
+    """
+    if not isinstance(db.sync_session, RoutingSession) or db.info.get(_USE_PRIMARY):
+        return False
+    if key is not None and not read_router.is_sticky(key):
+        return False
+    db.info[_USE_PRIMARY] = True
+    return db.info.get(_REPLICA) is not None
+
+
+async def get_db() -> AsyncIterator[AsyncSession]:
+    async with SessionLocal() as db:
+        yield db
+
+
+async def _get_routed_db() -> AsyncIterator[AsyncSession]:
+    async with read_session() as db:
         yield db
-    finally:
-        db.close()
+
+
+# Like get_db, for handlers that only read: SELECTs go to a read replica
+# when DATABASE_REPLICA_URLS is set. Without replicas it is get_db itself,
+# so a request depending on both still gets one session and connection.
+get_read_db = _get_routed_db if replica_engines else get_db
+
+
+def dialect_insert(db: AsyncSession, entity):
+    """
+    INSERT construct for the session's backend, so callers can use
+    ON CONFLICT (on_conflict_do_update / on_conflict_do_nothing).
+    """
+    if db.bind.dialect.name == "sqlite":
+        return sqlite.insert(entity)
+    return postgresql.insert(entity)
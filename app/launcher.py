@@ -0,0 +1,139 @@
+"""
+Production entry point.
+
+    python -m app.launcher [--host 0.0.0.0] [--port 8000] [--workers N]
+
+- event loop: uvloop when installed, else asyncio; HTTP parser: httptools
+  when installed, else h11 (`pip install uvloop httptools`)
+- workers: --workers, WEB_CONCURRENCY, or one per CPU available to this
+  process (cgroup / affinity aware where the platform reports it)
+- DB_CONNECTION_BUDGET: Postgres connections all workers together may
+  open. Each worker gets budget // workers, split into DB_POOL_SIZE and
+  DB_MAX_OVERFLOW; without a budget the per-worker settings are used as-is.
+  Read replicas (DATABASE_REPLICA_URLS) get the same pool settings, so the
+  budget holds for each of them too.
+- PASSWORD_POOL_SIZE defaults to the CPUs per worker, so N workers don't
+  each start one bcrypt process per core.
+- SHUTDOWN_GRACE_SECONDS: on SIGTERM, how long in-flight requests may run
+  before they are cut off; the lifespan drain (app.core.lifecycle) starts
+  after that, so the orchestrator's kill timeout should cover both.
+
+uvicorn spawns each worker as a fresh process that imports app.main
+itself, so the derived settings reach the workers through the environment.
+"""
+
+import argparse
+import importlib.util
+import logging
+import os
+from typing import Optional
+
+from app.core import config  # noqa: F401  (loads .env)
+
+logger = logging.getLogger("app.launcher")
+
+# 🔹 Launcher config from env
+HOST = os.getenv("HOST", "0.0.0.0")
+PORT = int(os.getenv("PORT", "8000"))
+WEB_CONCURRENCY = os.getenv("WEB_CONCURRENCY")
+DB_CONNECTION_BUDGET = os.getenv("DB_CONNECTION_BUDGET")
+# share of each worker's connections kept as burst-only overflow
+DB_OVERFLOW_SHARE = float(os.getenv("DB_OVERFLOW_SHARE", "0.25"))
+LOG_LEVEL = os.getenv("LOG_LEVEL", "info")
+SHUTDOWN_GRACE_SECONDS = int(os.getenv("SHUTDOWN_GRACE_SECONDS", "20"))
+
+
+def available_cpus() -> int:
+    if hasattr(os, "process_cpu_count"):  # 3.13+
+        return os.process_cpu_count() or 1
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0)) or 1
+    return os.cpu_count() or 1
+
+
+def _installed(module: str) -> bool:
+    return importlib.util.find_spec(module) is not None
+
+
+def pick_loop() -> str:
+    return "uvloop" if _installed("uvloop") else "asyncio"
+
+
+def pick_http() -> str:
+    return "httptools" if _installed("httptools") else "h11"
+
+
+def pool_settings(budget: int, workers: int) -> tuple[int, int]:
+    """
+    (pool_size, max_overflow) per worker so that
+    workers * (pool_size + max_overflow) <= budget.
+    """
+    per_worker = budget // workers
+    if per_worker < 1:
+        raise ValueError(
+            f"DB_CONNECTION_BUDGET={budget} leaves no connection for each of "
+            f"{workers} workers"
+        )
+    max_overflow = int(per_worker * DB_OVERFLOW_SHARE)
+    return per_worker - max_overflow, max_overflow
+
+
+def worker_env(workers: int, budget: Optional[int], cpus: int) -> dict[str, str]:
+    env = {}
+    if budget is not None:
+        pool_size, max_overflow = pool_settings(budget, workers)
+        env["DB_POOL_SIZE"] = str(pool_size)
+        env["DB_MAX_OVERFLOW"] = str(max_overflow)
+    if "PASSWORD_POOL_SIZE" not in os.environ:
+        env["PASSWORD_POOL_SIZE"] = str(max(1, cpus // workers))
+    return env
+
+
+def main() -> None:
+    import uvicorn
+
+    cpus = available_cpus()
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--workers", type=int, default=int(WEB_CONCURRENCY or cpus))
+    parser.add_argument(
+        "--db-connection-budget",
+        type=int,
+        default=int(DB_CONNECTION_BUDGET) if DB_CONNECTION_BUDGET else None,
+    )
+    parser.add_argument("--log-level", default=LOG_LEVEL)
+    parser.add_argument(
+        "--shutdown-grace-seconds", type=int, default=SHUTDOWN_GRACE_SECONDS
+    )
+    parser.add_argument("--no-access-log", action="store_true")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=args.log_level.upper())
+    env = worker_env(args.workers, args.db_connection_budget, cpus)
+    os.environ.update(env)
+
+    loop, http = pick_loop(), pick_http()
+    logger.info(
+        "Starting %d worker(s) on %d CPU(s): loop=%s http=%s %s",
+        args.workers,
+        cpus,
+        loop,
+        http,
+        " ".join(f"{key}={value}" for key, value in sorted(env.items())),
+    )
+    uvicorn.run(
+        "app.main:app",
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        loop=loop,
+        http=http,
+        log_level=args.log_level,
+        access_log=not args.no_access_log,
+        timeout_graceful_shutdown=args.shutdown_grace_seconds,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,23 +1,74 @@
-from fastapi import FastAPI, Depends, HTTPException
+from app.core.startup import startup_report  # first: times every import below
+from app.core import config  # noqa: F401  (loads .env)
+from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.orm import Session
-from sqlalchemy import text
+import asyncio
 from contextlib import asynccontextmanager
 from app.routers.main_router import router
+from app.routers.health import router as health_router
+from app.core import metrics, sql_profiler
+from app.core.deadline import DeadlineMiddleware
+from app.core.health import health_prober
+from app.core.lifecycle import WARMING_UP, WARMUP_ENABLED, drain, warm_up
+from app.core.password_pool import shutdown_password_pool
+from app.core.otp_store import otp_store, run_otp_sweeper
+from app.core.revocation import revocation_list
+from app.core.schema import check_schema
+from app.core.security import JWT_CLAIMS_TOKENS
+from app.services.outbox.service import outbox_dispatcher
+from app.services.sendgrid.service import mailer
+from app.services.twilio.service import twilio_verify
+from app.db import engine, replica_engines
 
-
-from app.db import Base, engine, get_db
-from app.models import user
+startup_report.imports_done()
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    Base.metadata.create_all(bind=engine)
+    with startup_report.phase("schema_check"):
+        await check_schema(engine)
+
+    with startup_report.phase("health_probe"):
+        await health_prober.probe_all()
+
+    outbox_task = asyncio.create_task(outbox_dispatcher.run())
+    background_tasks = [
+        asyncio.create_task(run_otp_sweeper(otp_store)),
+        asyncio.create_task(health_prober.run()),
+    ]
+    if JWT_CLAIMS_TOKENS:
+        # claims tokens must not be trusted before the deny-set is loaded
+        with startup_report.phase("revocation_refresh"):
+            await revocation_list.refresh()
+        background_tasks.append(asyncio.create_task(revocation_list.run()))
+    if WARMUP_ENABLED:
+        # runs once the server is up; /health/ready answers 503 until done
+        health_prober.hold(WARMING_UP)
+        background_tasks.append(asyncio.create_task(warm_up(app)))
+    startup_report.finish()
+
     yield
     print("Shutting down...")
+    await drain(outbox_task)
+    for task in background_tasks:
+        task.cancel()
+    shutdown_password_pool()
+    await twilio_verify.aclose()
+    await mailer.aclose()
+    for db_engine in (engine, *replica_engines):
+        await db_engine.dispose()
 
 
-app = FastAPI(title="RRII TAILOR GALLERY API", lifespan=lifespan)
+app = FastAPI(
+    title="RRII TAILOR GALLERY API",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,
+)
+
+# innermost: CORS wraps it, so 504/503 bodies carry the CORS headers, and
+# the metrics middleware counts timed-out requests as 504s
+app.add_middleware(DeadlineMiddleware)
 
 app.add_middleware(
     CORSMiddleware,
@@ -27,7 +78,17 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+if metrics.METRICS_ENABLED:
+    app.add_middleware(metrics.MetricsMiddleware)
+
+if sql_profiler.SQL_PROFILER_ENABLED:
+    # reads routed to replicas count towards the request's profile too
+    for db_engine in (engine, *replica_engines):
+        sql_profiler.install(db_engine)
+    app.add_middleware(sql_profiler.SqlProfilerMiddleware)
+
 app.include_router(router)
+app.include_router(health_router)
 
 
 @app.get("/")
@@ -35,10 +96,6 @@ async def root():
     return {"message": "Server is running"}
 
 
-@app.get("/health/db")
-async def health_db(db: Session = Depends(get_db)):
-    try:
-        db.execute(text("SELECT 1"))
-        return {"status": "ok", "value": 1}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e)) from e
+@app.get("/metrics", include_in_schema=False)
+async def read_metrics():
+    return PlainTextResponse(metrics.registry.render(), media_type=metrics.CONTENT_TYPE)
@@ -1,3 +1,5 @@
 from .user import User  # noqa: F401
+from .outbox import EmailOutbox  # noqa: F401
+from .otp import OtpCode  # noqa: F401
 
-__all__ = ["User"]
+__all__ = ["User", "EmailOutbox", "OtpCode"]
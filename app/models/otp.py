@@ -0,0 +1,36 @@
+from sqlalchemy import (
+    Column,
+    DateTime,
+    Integer,
+    String,
+    UniqueConstraint,
+    func,
+)
+from app.db import Base
+
+
+class OtpChannel:
+    EMAIL = "email"
+    PHONE = "phone"
+
+
+class OtpCode(Base):
+    """
+    Pending one-time codes, one row per (channel, target).
+
+    Kept off the `users` table so OTP churn never rewrites user rows.
+    """
+
+    __tablename__ = "otp_codes"
+
+    id = Column(Integer, primary_key=True)
+    channel = Column(String(20), nullable=False)
+    target = Column(String(255), nullable=False)
+    code_hash = Column(String(64), nullable=False)
+    attempts = Column(Integer, nullable=False, default=0, server_default="0")
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        UniqueConstraint("channel", "target", name="uq_otp_codes_channel_target"),
+    )
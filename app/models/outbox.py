@@ -0,0 +1,54 @@
+from sqlalchemy import (
+    JSON,
+    Column,
+    DateTime,
+    Index,
+    Integer,
+    String,
+    Text,
+    func,
+)
+from app.db import Base
+
+
+class OutboxStatus:
+    PENDING = "pending"
+    SENT = "sent"
+    FAILED = "failed"
+
+
+class EmailOutbox(Base):
+    """
+    Outgoing emails, written in the same transaction as the change that
+    triggers them and delivered later by the outbox dispatcher.
+    """
+
+    __tablename__ = "email_outbox"
+
+    id = Column(Integer, primary_key=True)
+    kind = Column(String(50), nullable=False)
+    recipient = Column(String(255), nullable=False)
+    payload = Column(JSON, nullable=False)
+    status = Column(
+        String(20),
+        nullable=False,
+        default=OutboxStatus.PENDING,
+        server_default=OutboxStatus.PENDING,
+    )
+    attempts = Column(Integer, nullable=False, default=0, server_default="0")
+    next_attempt_at = Column(
+        DateTime(timezone=True), nullable=False, server_default=func.now()
+    )
+    locked_until = Column(DateTime(timezone=True), nullable=True)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    sent_at = Column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        # the dispatcher only ever scans pending rows that are due
+        Index(
+            "ix_email_outbox_pending_due",
+            "next_attempt_at",
+            postgresql_where=status == OutboxStatus.PENDING,
+        ),
+    )
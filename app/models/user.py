@@ -3,6 +3,7 @@ from sqlalchemy import (
     Boolean,
     Column,
     DateTime,
+    Index,
     Integer,
     String,
     func,
@@ -30,11 +31,22 @@ class User(Base):
     is_phone_verified = Column(Boolean, nullable=False, default=False)
     is_email_verified = Column(Boolean, nullable=False, default=False)
     role = Column(String(20), nullable=False, default=UserRole.USER)
-    email_otp_code = Column(String(6), nullable=True)
-    email_otp_expires_at = Column(DateTime(timezone=True), nullable=True)
+    # bumped to invalidate every access token issued before
+    token_version = Column(Integer, nullable=False, default=0, server_default="0")
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(
         DateTime(timezone=True),
         server_default=func.now(),
         onupdate=func.now(),
     )
+
+    __table_args__ = (
+        # case-insensitive uniqueness; the INCLUDE columns let the login
+        # lookup run as an index-only scan on PostgreSQL
+        Index(
+            "ix_users_email_lower",
+            func.lower(email),
+            unique=True,
+            postgresql_include=["email", "uuid", "password_hash", "is_active"],
+        ),
+    )
@@ -0,0 +1,46 @@
+from fastapi import APIRouter, HTTPException, status
+from app.core.health import OK, health_prober
+from app.core.startup import startup_report
+from app.core.user_cache import user_cache
+from app.db import pool_stats
+
+router = APIRouter(prefix="/health", tags=["health"])
+
+
+@router.get("/live")
+async def health_live():
+    # no dependencies: answering at all means the event loop is responsive
+    return {"status": "ok"}
+
+
+@router.get("/ready")
+async def health_ready():
+    body = {
+        "status": "ok" if health_prober.ready() else "unavailable",
+        "checks": health_prober.snapshot(),
+        "holds": sorted(health_prober.holds),
+        "pool": pool_stats(),
+    }
+    if body["status"] != "ok":
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=body
+        )
+    return body
+
+
+@router.get("/db")
+async def health_db():
+    check = health_prober.snapshot()["db"]
+    if check["status"] != OK:
+        raise HTTPException(status_code=500, detail=check.get("error") or "db is down")
+    return {"status": "ok", "value": 1, **check, "pool": pool_stats()}
+
+
+@router.get("/user-cache")
+async def health_user_cache():
+    return user_cache.stats()
+
+
+@router.get("/startup")
+async def health_startup():
+    return startup_report.as_dict()
@@ -1,5 +1,7 @@
 from fastapi import APIRouter
 from app.routers.users.auth_router import router as auth_router
+from app.routers.admin.users import router as admin_users_router
 
 router = APIRouter(prefix="/api/v1", tags=["api"])
 router.include_router(auth_router)
+router.include_router(admin_users_router)
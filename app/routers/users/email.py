@@ -1,204 +1,313 @@
+import asyncio
+import logging
+from uuid import UUID
+
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from app.core.security import create_access_token, hash_password, verify_password
-from app.db import get_db
+from sqlalchemy import func, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.password_pool import hash_password_in_pool, verify_password_in_pool
+from app.core import metrics
+from app.core.security import create_user_access_token, needs_rehash
+from app.db import (
+    SessionLocal,
+    dialect_insert,
+    get_db,
+    get_read_db,
+    read_router,
+    use_primary,
+)
 from app.models.user import User, UserRole
 from app.schemas.user import (
     BindEmailStartRequest,
     BindEmailVerifyRequest,
     EmailLoginRequest,
+    EmailMessageResponse,
     EmailRegisterRequest,
     EmailVerifyOtpRequest,
     TokenResponse,
 )
-from app.services.sendgrid.service import send_email_otp
-import random
-from datetime import datetime, timedelta, timezone
-from app.core.deps import get_curret_user
+from app.services.outbox.service import enqueue_email_otp, outbox_dispatcher
+from app.core.lifecycle import spawn
+from app.core.deps import credentials_exception, get_curret_user, load_user
+from app.core.otp_store import OtpResult, otp_store
+from app.core.rate_limit import RateLimit
+from app.core.responses import token_response
+from app.core.user_cache import CachedUser, user_cache
+from app.models.otp import OtpChannel
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(tags=["email"])
 
+# defaults are per-identity / per-IP / global; see app/core/rate_limit.py
+register_limit = RateLimit(
+    "email_register", "3/600", "20/600", "50/1", identity_field="email"
+)
+login_limit = RateLimit(
+    "email_login", "10/300", "30/60", "200/1", identity_field="email"
+)
 
-@router.post("/email/register")
-async def user_register(payload: EmailRegisterRequest, db: Session = Depends(get_db)):
-    existing_user = db.query(User).filter(User.email == payload.email).first()
-    if existing_user:
+
+# user uuid -> running rehash, so concurrent logins start only one
+_rehash_tasks: dict[UUID, asyncio.Task] = {}
+
+
+async def _rehash_password(user_uuid: UUID, old_hash: str, password: str) -> None:
+    """
+    Re-hash with the current bcrypt settings after a successful login.
+    The update only applies if the hash is still the one we verified, so a
+    password change in the meantime is never overwritten.
+    """
+    try:
+        new_hash = await hash_password_in_pool(password)
+    except HTTPException:
+        # password pool saturated; the next login tries again
+        metrics.password_rehash_total.inc("busy")
+        return
+    try:
+        async with SessionLocal() as db:
+            result = await db.execute(
+                update(User)
+                .where(User.uuid == user_uuid, User.password_hash == old_hash)
+                .values(password_hash=new_hash)
+            )
+            await db.commit()
+    except Exception:
+        logger.exception("Failed to store upgraded password hash")
+        return
+    metrics.password_rehash_total.inc("upgraded" if result.rowcount else "changed")
+
+
+def _check_otp(result: str, messages: dict) -> None:
+    if result != OtpResult.OK:
         raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST, detail="User already exists"
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=messages.get(result, "Invalid verification code."),
         )
-    hashed_password = hash_password(payload.password)
-    email_otp_code = f"{random.randint(0, 999999):06d}"
-    email_otp_expires_at = datetime.now(timezone.utc) + timedelta(minutes=10)
-
-    user = User(
-        email=payload.email,
-        password_hash=hashed_password,
-        auth_provider="email",
-        role=UserRole.USER,
-        is_active=True,
-        is_email_verified=False,
-        email_otp_code=email_otp_code,
-        email_otp_expires_at=email_otp_expires_at,
+
+
+@router.post(
+    "/email/register",
+    response_model=EmailMessageResponse,
+    dependencies=[Depends(register_limit)],
+)
+async def user_register(
+    payload: EmailRegisterRequest, db: AsyncSession = Depends(get_db)
+):
+    # index-only probe on ix_users_email_lower, so a duplicate sign-up is
+    # turned away without spending a bcrypt hash on it
+    taken = await db.scalar(
+        select(User.id).where(func.lower(User.email) == payload.email)
     )
-    db.add(user)
-    db.commit()
-    db.refresh(user)
+    # hand the connection back rather than hold a transaction over the hash
+    await db.rollback()
+    if taken is not None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="User already exists"
+        )
 
-    try:
-        send_email_otp(user)
-    except Exception as e:
+    hashed_password = await hash_password_in_pool(payload.password)
+
+    # ON CONFLICT still guards the insert against a concurrent sign-up of
+    # the same email, including case variants of it
+    user_id = await db.scalar(
+        dialect_insert(db, User)
+        .values(
+            email=payload.email,
+            password_hash=hashed_password,
+            auth_provider="email",
+            role=UserRole.USER,
+            is_active=True,
+            is_email_verified=False,
+        )
+        .on_conflict_do_nothing(index_elements=[func.lower(User.email)])
+        .returning(User.id)
+    )
+    if user_id is None:
+        await db.rollback()
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Failed to send email OTP: {e}",
+            status_code=status.HTTP_400_BAD_REQUEST, detail="User already exists"
         )
 
+    code, expires_at = await otp_store.issue(db, OtpChannel.EMAIL, payload.email)
+    enqueue_email_otp(db, payload.email, code, expires_at)
+    await db.commit()
+    read_router.stick(payload.email)
+    outbox_dispatcher.notify()
+
     return {
         "message": "Please check your email for the verification code",
-        "email": user.email,
+        "email": payload.email,
     }
 
 
-@router.post("/email/verify-otp")
+@router.post("/email/verify-otp", response_model=TokenResponse)
 async def verify_email_otp(
-    payload: EmailVerifyOtpRequest, db: Session = Depends(get_db)
+    payload: EmailVerifyOtpRequest, db: AsyncSession = Depends(get_db)
 ):
-    user = db.query(User).filter(User.email == payload.email).first()
+    result = await otp_store.consume(db, OtpChannel.EMAIL, payload.email, payload.code)
+    _check_otp(
+        result,
+        {
+            OtpResult.NOT_FOUND: "Email OTP not found",
+            OtpResult.EXPIRED: "Email OTP expired",
+            OtpResult.TOO_MANY_ATTEMPTS: "Too many attempts, request a new code.",
+        },
+    )
 
-    if not user:
+    user = await db.scalar(
+        update(User)
+        .where(func.lower(User.email) == payload.email)
+        .values(is_email_verified=True)
+        .returning(User)
+    )
+    if user is None:
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST, detail="User not found"
         )
 
-    if not user.email_otp_code or not user.email_otp_expires_at:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST, detail="Email OTP not found"
-        )
+    await db.commit()
+    user_cache.invalidate(user.uuid)
+    read_router.stick(user.uuid, payload.email)
+    access_token = create_user_access_token(user)
+    return token_response(access_token, user)
 
-    now_utc = datetime.now(timezone.utc)
-    if user.email_otp_expires_at < now_utc:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST, detail="Email OTP expired"
-        )
 
-    if payload.code != user.email_otp_code:
+@router.post(
+    "/email/login", response_model=TokenResponse, dependencies=[Depends(login_limit)]
+)
+async def email_login(
+    payload: EmailLoginRequest, db: AsyncSession = Depends(get_read_db)
+):
+    # index-only scan on ix_users_email_lower: failed logins never touch
+    # the table, and a successful one loads the user by uuid (usually cached)
+    query = select(User.uuid, User.password_hash, User.is_active).where(
+        func.lower(User.email) == payload.email
+    )
+    use_primary(db, payload.email)
+    account = (await db.execute(query)).first()
+    if not account and use_primary(db):
+        # the replica may not have a sign-up from another worker yet
+        account = (await db.execute(query)).first()
+
+    if not account:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Invalid verification code.",
+            detail="user not found",
         )
 
-    user.is_email_verified = True
-    user.email_otp_code = None
-    user.email_otp_expires_at = None
-
-    db.commit()
-    db.refresh(user)
-    access_token = create_access_token(data={"sub": str(user.uuid)})
-    return {"access_token": access_token, "token_type": "Bearer", "user": user}
-
-
-@router.post("/email/login", response_model=TokenResponse)
-async def email_login(payload: EmailLoginRequest, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.email == payload.email).first()
-
-    if not user:
+    # hand the connection back rather than hold a transaction over bcrypt
+    await db.rollback()
+    verified = await verify_password_in_pool(payload.password, account.password_hash)
+    if not verified and use_primary(db):
+        # ... or a password change; only a different hash is worth a
+        # second bcrypt verify
+        fresh = (await db.execute(query)).first()
+        await db.rollback()
+        if fresh and fresh.password_hash != account.password_hash:
+            account = fresh
+            verified = await verify_password_in_pool(
+                payload.password, account.password_hash
+            )
+
+    if not verified:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="user not found",
+            detail="Invalid password",
         )
 
-    if not verify_password(payload.password, user.password_hash):
+    if not account.is_active:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Invalid password",
+            detail="User is inactive",
+        )
+
+    if needs_rehash(account.password_hash) and account.uuid not in _rehash_tasks:
+        # off the request path: the login response doesn't wait for a second hash
+        user_uuid = account.uuid
+        _rehash_tasks[user_uuid] = spawn(
+            _rehash_password(user_uuid, account.password_hash, payload.password)
+        )
+        _rehash_tasks[user_uuid].add_done_callback(
+            lambda _: _rehash_tasks.pop(user_uuid, None)
         )
 
-    access_token = create_access_token(data={"sub": str(user.uuid)})
-    return {"access_token": access_token, "token_type": "Bearer", "user": user}
+    user = await load_user(db, account.uuid)
+    access_token = create_user_access_token(user)
+    return token_response(access_token, user)
 
 
-@router.post("/me/bind-email-start")
+@router.post("/me/bind-email-start", response_model=EmailMessageResponse)
 async def bind_email_start(
     payload: BindEmailStartRequest,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_curret_user),
+    db: AsyncSession = Depends(get_db),
+    current_user: CachedUser = Depends(get_curret_user),
 ):
+    hashed_password = await hash_password_in_pool(payload.password)
 
-    email_owner = (
-        db.query(User)
-        .filter(User.email == payload.email, User.uuid != current_user.uuid)
-        .first()
-    )
-
-    if email_owner:
+    try:
+        # ix_users_email_lower rejects addresses owned by someone else
+        email = await db.scalar(
+            update(User)
+            .where(User.id == current_user.id)
+            .values(
+                email=payload.email,
+                password_hash=hashed_password,
+                is_email_verified=False,
+            )
+            .returning(User.email)
+        )
+    except IntegrityError:
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email already bound to another user",
         )
+    if email is None:
+        raise credentials_exception()
 
-    hashed_password = hash_password(payload.password)
-
-    email_otp_code = f"{random.randint(0, 999999):06d}"
-    email_otp_expires_at = datetime.now(timezone.utc) + timedelta(minutes=10)
-
-    current_user.email = payload.email
-    current_user.password_hash = hashed_password
-    current_user.email_otp_code = email_otp_code
-    current_user.email_otp_expires_at = email_otp_expires_at
-    current_user.is_email_verified = False
-
-    db.add(current_user)
-    db.commit()
-    db.refresh(current_user)
-
-    try:
-        send_email_otp(current_user)
-    except Exception as e:
-        print(f"Failed to send email OTP: {e}")
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Failed to send email OTP: {e}",
-        )
+    code, expires_at = await otp_store.issue(db, OtpChannel.EMAIL, email)
+    enqueue_email_otp(db, email, code, expires_at)
+    await db.commit()
+    user_cache.invalidate(current_user.uuid)
+    read_router.stick(current_user.uuid, email)
+    outbox_dispatcher.notify()
 
     return {
         "message": "Please check your email for the verification code",
-        "email": current_user.email,
+        "email": email,
     }
 
 
-@router.post("/me/bind-email-verify")
+@router.post("/me/bind-email-verify", response_model=EmailMessageResponse)
 async def bind_email_verify(
     payload: BindEmailVerifyRequest,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_curret_user),
+    db: AsyncSession = Depends(get_db),
+    current_user: CachedUser = Depends(get_curret_user),
 ):
-    if not current_user.email_otp_code or not current_user.email_otp_expires_at:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="No email verification code pending for this user.",
-        )
-
-    now_utc = datetime.now(timezone.utc)
-    if current_user.email_otp_expires_at < now_utc:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Verification code has expired.",
-        )
-
-    if payload.code != current_user.email_otp_code:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Invalid verification code.",
-        )
-
-    current_user.is_email_verified = True
-    current_user.email_otp_code = None
-    current_user.email_otp_expires_at = None
+    # read fresh: the cached snapshot may predate bind-email-start
+    email = await db.scalar(select(User.email).where(User.id == current_user.id))
+
+    result = await otp_store.consume(db, OtpChannel.EMAIL, email, payload.code)
+    _check_otp(
+        result,
+        {
+            OtpResult.NOT_FOUND: "No email verification code pending for this user.",
+            OtpResult.EXPIRED: "Verification code has expired.",
+            OtpResult.TOO_MANY_ATTEMPTS: "Too many attempts, request a new code.",
+        },
+    )
 
-    db.add(current_user)
-    db.commit()
-    db.refresh(current_user)
+    await db.execute(
+        update(User).where(User.id == current_user.id).values(is_email_verified=True)
+    )
+    await db.commit()
+    user_cache.invalidate(current_user.uuid)
+    read_router.stick(current_user.uuid)
 
     return {
         "message": "Email successfully verified and linked to your account.",
-        "email": current_user.email,
+        "email": email,
     }
@@ -1,16 +1,29 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from app.core.deps import get_curret_user
+from app.core.deps import credentials_exception, get_curret_user
+from app.core.circuit_breaker import CircuitOpenError
+from app.core.deadline import DeadlineExceeded
+from app.core.rate_limit import RateLimit
+from app.core.responses import token_response
+from app.core.singleflight import (
+    SINGLEFLIGHT_SEND_DEDUPE_SECONDS,
+    SINGLEFLIGHT_VERIFY_DEDUPE_SECONDS,
+    SingleFlight,
+)
+from app.core.user_cache import CachedUser, user_cache
 from app.schemas.user import (
     BindPhoneStartRequest,
     BindPhoneVerifyRequest,
+    MessageResponse,
+    PhoneMessageResponse,
     PhoneRequestOtp,
     PhoneVerifyOtp,
 )
 from app.services.twilio.service import send_verification_code, check_verification_code
-from app.core.security import create_access_token
-from app.db import get_db
+from app.core.security import create_user_access_token
+from app.db import SessionLocal, dialect_insert, get_read_db, read_router
 from app.models.user import User, UserRole
-from sqlalchemy.orm import Session
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import IntegrityError
 from app.schemas.user import (
     PhoneRequestOtp,
@@ -18,18 +31,34 @@ from app.schemas.user import (
     TokenResponse,
 )
 
-
 router = APIRouter(tags=["phone"])
 
+# every send is a paid Twilio call; see app/core/rate_limit.py
+send_otp_limit = RateLimit(
+    "phone_send_otp", "3/600", "10/600", "20/1", identity_field="phone_number"
+)
 
-@router.post("/phone/send-otp")
-async def request_phone_otp(payload: PhoneRequestOtp):
-    """
-    Start phone verification by sending an OTP via Twilio.
-    """
+
+def _provider_unavailable(e: CircuitOpenError) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Phone verification is temporarily unavailable",
+        headers={"Retry-After": str(e.retry_after)},
+    )
+
+
+# double-fired requests share one Twilio call (see app/core/singleflight.py)
+phone_sends = SingleFlight("phone_send", SINGLEFLIGHT_SEND_DEDUPE_SECONDS)
+phone_verifications = SingleFlight("phone_verify", SINGLEFLIGHT_VERIFY_DEDUPE_SECONDS)
+
+
+async def _send_code(phone_number: str) -> None:
     try:
-        send_verification_code(payload.phone_number)
-        return {"message": "OTP sent (Twilio trial: only to verified numbers)."}
+        await send_verification_code(phone_number)
+    except CircuitOpenError as e:
+        raise _provider_unavailable(e)
+    except DeadlineExceeded:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -37,13 +66,13 @@ async def request_phone_otp(payload: PhoneRequestOtp):
         )
 
 
-@router.post("/phone/verify-otp", response_model=TokenResponse)
-async def verify_phone_otp(payload: PhoneVerifyOtp, db: Session = Depends(get_db)):
-    """
-    Verify the OTP code sent to the phone number.
-    """
+async def _check_code(phone_number: str, code: str) -> None:
     try:
-        verification_check = check_verification_code(payload.phone_number, payload.code)
+        verification_check = await check_verification_code(phone_number, code)
+    except CircuitOpenError as e:
+        raise _provider_unavailable(e)
+    except DeadlineExceeded:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -53,54 +82,72 @@ async def verify_phone_otp(payload: PhoneVerifyOtp, db: Session = Depends(get_db
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid or expired OTP"
         )
+    # the code is used up: a new send must reach Twilio again
+    phone_sends.forget(phone_number)
+
+
+@router.post(
+    "/phone/send-otp",
+    response_model=MessageResponse,
+    dependencies=[Depends(send_otp_limit)],
+)
+async def request_phone_otp(payload: PhoneRequestOtp):
+    """
+    Start phone verification by sending an OTP via Twilio.
+    """
+    await phone_sends.do(payload.phone_number, lambda: _send_code(payload.phone_number))
+    return {"message": "OTP sent (Twilio trial: only to verified numbers)."}
+
 
-    user = db.query(User).filter(User.phone_number == payload.phone_number).first()
+async def _verify_phone(phone_number: str, code: str) -> CachedUser:
+    await _check_code(phone_number, code)
 
-    if not user:
-        user = User(
-            phone_number=payload.phone_number,
+    # own session: the call is shared by every duplicate request
+    async with SessionLocal() as db:
+        # create-or-mark-verified in one statement, race free on phone_number
+        stmt = dialect_insert(db, User).values(
+            phone_number=phone_number,
             auth_provider="phone",
             role=UserRole.USER,
             is_active=True,
             is_phone_verified=True,
         )
-        db.add(user)
-    else:
-        user.is_phone_verified = True
-    try:
-        # 5) Commit new user to DB
-        db.commit()
-    except IntegrityError:
-        # 6) If another request already created the same phone in parallel
-        db.rollback()
-        # Try to load existing user instead
-        existing = (
-            db.query(User).filter(User.phone_number == payload.phone_number).first()
-        )
-        if not existing:
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="Failed to create or fetch user after OTP verification.",
-            )
-        user = existing
-    db.refresh(user)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[User.phone_number],
+            set_={"is_phone_verified": True, "updated_at": func.now()},
+        ).returning(User)
+        user = await db.scalar(stmt, execution_options={"populate_existing": True})
+        await db.commit()
+    user_cache.invalidate(user.uuid)
+    read_router.stick(user.uuid)
+    return CachedUser.from_user(user)
+
 
-    access_token = create_access_token(data={"sub": str(user.uuid)})
-    return {"access_token": access_token, "token_type": "Bearer", "user": user}
+@router.post("/phone/verify-otp", response_model=TokenResponse)
+async def verify_phone_otp(payload: PhoneVerifyOtp):
+    """
+    Verify the OTP code sent to the phone number.
+    """
+    user = await phone_verifications.do(
+        ("login", payload.phone_number, payload.code),
+        lambda: _verify_phone(payload.phone_number, payload.code),
+    )
+    access_token = create_user_access_token(user)
+    return token_response(access_token, user)
 
 
-@router.post("/me/bind-phone-start")
+@router.post("/me/bind-phone-start", response_model=PhoneMessageResponse)
 async def bind_phone_start(
     payload: BindPhoneStartRequest,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_curret_user),
+    db: AsyncSession = Depends(get_read_db),
+    current_user: CachedUser = Depends(get_curret_user),
 ):
-    phone_owner = (
-        db.query(User)
-        .filter(
-            User.phone_number == payload.phone_number, User.uuid != current_user.uuid
+    # a replica may lag; that's fine here, the unique index on phone_number
+    # has the final word in bind-phone-verify
+    phone_owner = await db.scalar(
+        select(User.id).where(
+            User.phone_number == payload.phone_number, User.id != current_user.id
         )
-        .first()
     )
 
     if phone_owner:
@@ -109,13 +156,7 @@ async def bind_phone_start(
             detail="Phone number already bound to another user",
         )
 
-    try:
-        send_verification_code(payload.phone_number)
-    except Exception as e:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Failed to send OTP: {e}",
-        )
+    await phone_sends.do(payload.phone_number, lambda: _send_code(payload.phone_number))
 
     return {
         "message": "Please check your phone for the verification code",
@@ -123,28 +164,43 @@ async def bind_phone_start(
     }
 
 
-@router.post("/me/bind-phone-verify")
-async def bind_phone_verify(
-    payload: BindPhoneVerifyRequest,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_curret_user),
-):
+async def _bind_phone(user_id: int, phone_number: str, code: str) -> str:
+    await _check_code(phone_number, code)
 
-    verification_check = check_verification_code(payload.phone_number, payload.code)
+    async with SessionLocal() as db:
+        try:
+            # the unique index on phone_number rejects numbers owned by someone else
+            bound_number = await db.scalar(
+                update(User)
+                .where(User.id == user_id)
+                .values(phone_number=phone_number, is_phone_verified=True)
+                .returning(User.phone_number)
+            )
+            await db.commit()
+        except IntegrityError:
+            await db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Phone number already bound to another user",
+            )
+    if bound_number is None:
+        raise credentials_exception()
+    return bound_number
 
-    if verification_check.status != "approved":
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Invalid or expired OTP",
-        )
 
-    current_user.is_phone_verified = True
-    current_user.phone_number = payload.phone_number
-    db.add(current_user)
-    db.commit()
-    db.refresh(current_user)
+@router.post("/me/bind-phone-verify", response_model=PhoneMessageResponse)
+async def bind_phone_verify(
+    payload: BindPhoneVerifyRequest,
+    current_user: CachedUser = Depends(get_curret_user),
+):
+    phone_number = await phone_verifications.do(
+        ("bind", current_user.id, payload.phone_number, payload.code),
+        lambda: _bind_phone(current_user.id, payload.phone_number, payload.code),
+    )
+    user_cache.invalidate(current_user.uuid)
+    read_router.stick(current_user.uuid)
 
     return {
         "message": "Phone number successfully verified and linked to your account.",
-        "phone_number": current_user.phone_number,
+        "phone_number": phone_number,
     }
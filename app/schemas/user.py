@@ -1,5 +1,11 @@
+from datetime import datetime
+from typing import Annotated, Literal
 from uuid import UUID
-from pydantic import BaseModel, Field, EmailStr
+from pydantic import AfterValidator, BaseModel, Field, EmailStr
+
+# emails are matched case-insensitively (see ix_users_email_lower); new
+# rows and OTP targets are stored lowercased
+NormalizedEmail = Annotated[EmailStr, AfterValidator(str.lower)]
 
 
 class PhoneSignupRequest(BaseModel):
@@ -16,22 +22,22 @@ class PhoneVerifyOtp(BaseModel):
 
 
 class EmailRegisterRequest(BaseModel):
-    email: EmailStr
+    email: NormalizedEmail
     password: str = Field(..., min_length=6, max_length=128)
 
 
 class EmailLoginRequest(BaseModel):
-    email: EmailStr
+    email: NormalizedEmail
     password: str
 
 
 class EmailVerifyOtpRequest(BaseModel):
-    email: EmailStr
+    email: NormalizedEmail
     code: str = Field(..., min_length=4, max_length=10)
 
 
 class BindEmailStartRequest(BaseModel):
-    email: EmailStr
+    email: NormalizedEmail
     password: str = Field(..., min_length=6, max_length=128)
 
 
@@ -61,7 +67,58 @@ class UserResponse(BaseModel):
         from_attributes = True
 
 
+class AdminUserResponse(UserResponse):
+    auth_provider: str
+    is_email_verified: bool
+    created_at: datetime | None
+    updated_at: datetime | None
+
+
+class UserPage(BaseModel):
+    items: list[AdminUserResponse]
+    # pass as after_id to get the next page; null on the last page
+    next_after_id: int | None
+
+
 class TokenResponse(BaseModel):
     access_token: str
     token_type: str
     user: UserResponse
+
+
+class MessageResponse(BaseModel):
+    message: str
+
+
+class EmailMessageResponse(MessageResponse):
+    email: str | None
+
+
+class PhoneMessageResponse(MessageResponse):
+    phone_number: str
+
+
+class UserImportRow(EmailRegisterRequest):
+    """
+    One account in a bulk import (CSV header or JSONL keys use these names).
+    """
+
+    phone_number: str | None = Field(None, min_length=5, max_length=32)
+    role: Literal["user", "tailor"] = "tailor"
+
+
+class UserImportError(BaseModel):
+    line: int
+    email: str | None = None
+    error: str
+
+
+class UserImportReport(BaseModel):
+    total: int
+    created: int
+    existing: int
+    duplicates: int
+    invalid: int
+    errors: list[UserImportError]
+    errors_truncated: bool
+    elapsed_seconds: float
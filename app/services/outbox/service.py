@@ -0,0 +1,288 @@
+import asyncio
+import logging
+import os
+import random
+import time
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import delete, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db import SessionLocal
+from app.models.outbox import EmailOutbox, OutboxStatus
+from app.core.circuit_breaker import CircuitOpenError
+from app.services.sendgrid.service import OtpEmail, mailer
+
+logger = logging.getLogger(__name__)
+
+# 🔹 Outbox config from env
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "50"))
+# parallel single-message sends when a batch call has to be split up
+OUTBOX_CONCURRENCY = int(os.getenv("OUTBOX_CONCURRENCY", "10"))
+OUTBOX_POLL_SECONDS = float(os.getenv("OUTBOX_POLL_SECONDS", "2"))
+OUTBOX_LEASE_SECONDS = int(os.getenv("OUTBOX_LEASE_SECONDS", "60"))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "8"))
+OUTBOX_BACKOFF_BASE_SECONDS = float(os.getenv("OUTBOX_BACKOFF_BASE_SECONDS", "5"))
+OUTBOX_BACKOFF_MAX_SECONDS = float(os.getenv("OUTBOX_BACKOFF_MAX_SECONDS", "900"))
+# sent / failed rows are kept this long (for debugging), then deleted
+OUTBOX_RETENTION_SECONDS = int(os.getenv("OUTBOX_RETENTION_SECONDS", "86400"))
+OUTBOX_SWEEP_SECONDS = float(os.getenv("OUTBOX_SWEEP_SECONDS", "300"))
+
+KIND_EMAIL_OTP = "email_otp"
+
+
+def enqueue_email_otp(
+    db: AsyncSession, email: str, code: str, expires_at: datetime
+) -> EmailOutbox:
+    """
+    Add an OTP email to the outbox. The caller commits it together with the
+    change that triggered it; nothing is sent inside the request.
+    """
+    message = EmailOutbox(
+        kind=KIND_EMAIL_OTP,
+        recipient=email,
+        payload={"code": code, "expires_at": expires_at.isoformat()},
+    )
+    db.add(message)
+    return message
+
+
+def _settled_payload(payload: dict) -> dict:
+    # the code is only needed until the email is out (or given up on);
+    # otp_codes keeps nothing but its hash, and neither should the outbox
+    return {key: value for key, value in payload.items() if key != "code"}
+
+
+def _backoff_seconds(attempts: int) -> float:
+    """
+    Exponential backoff (base * 2^(attempts-1), capped) with equal jitter,
+    so retries from one failed batch don't all land at the same moment.
+    """
+    ceiling = min(
+        OUTBOX_BACKOFF_MAX_SECONDS, OUTBOX_BACKOFF_BASE_SECONDS * 2 ** (attempts - 1)
+    )
+    return random.uniform(ceiling / 2, ceiling)
+
+
+class OutboxDispatcher:
+    """
+    Background worker that delivers `email_outbox` rows.
+
+    Each round claims a batch of due rows with FOR UPDATE SKIP LOCKED (so
+    several workers/processes never grab the same row), leases them for
+    OUTBOX_LEASE_SECONDS, sends them concurrently and records the outcome.
+    Sent and failed rows lose the OTP code from their payload right away
+    and are deleted after OUTBOX_RETENTION_SECONDS.
+    """
+
+    def __init__(self):
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+        self._next_sweep = 0.0
+
+    def notify(self) -> None:
+        """Wake the dispatcher right away (e.g. after a commit)."""
+        self._wakeup.set()
+
+    async def _claim_batch(self) -> list:
+        # computed here rather than as now() + interval in SQL, which SQLite
+        # turns into a number instead of a timestamp
+        now = datetime.now(timezone.utc)
+        due_ids = (
+            select(EmailOutbox.id)
+            .where(
+                EmailOutbox.status == OutboxStatus.PENDING,
+                EmailOutbox.next_attempt_at <= now,
+                or_(
+                    EmailOutbox.locked_until.is_(None),
+                    EmailOutbox.locked_until < now,
+                ),
+            )
+            .order_by(EmailOutbox.id)
+            .limit(OUTBOX_BATCH_SIZE)
+            .with_for_update(skip_locked=True)
+        )
+        stmt = (
+            update(EmailOutbox)
+            .where(EmailOutbox.id.in_(due_ids.scalar_subquery()))
+            .values(
+                locked_until=now + timedelta(seconds=OUTBOX_LEASE_SECONDS),
+                attempts=EmailOutbox.attempts + 1,
+            )
+            .returning(
+                EmailOutbox.id,
+                EmailOutbox.kind,
+                EmailOutbox.recipient,
+                EmailOutbox.payload,
+                EmailOutbox.attempts,
+            )
+            .execution_options(synchronize_session=False)
+        )
+        async with SessionLocal() as db:
+            rows = (await db.execute(stmt)).all()
+            await db.commit()
+        return rows
+
+    @staticmethod
+    def _otp_email(row) -> OtpEmail:
+        return OtpEmail(
+            email=row.recipient,
+            code=row.payload["code"],
+            expires_at=datetime.fromisoformat(row.payload["expires_at"]),
+        )
+
+    async def _deliver(self, rows: list) -> list:
+        """
+        Send OTP rows with one SendGrid call (personalizations).
+
+        If the batch call is rejected, retry one call per row so a single
+        bad recipient doesn't take the rest of the batch down with it.
+        Returns an error (or None) per row.
+        """
+        try:
+            await mailer.send_email_otp_batch([self._otp_email(row) for row in rows])
+            return [None] * len(rows)
+        except CircuitOpenError as e:
+            return [e] * len(rows)
+        except Exception as e:
+            if len(rows) == 1:
+                return [e]
+
+        semaphore = asyncio.Semaphore(OUTBOX_CONCURRENCY)
+
+        async def deliver_one(row):
+            async with semaphore:
+                try:
+                    await mailer.send_email_otp_batch([self._otp_email(row)])
+                    return None
+                except Exception as e:
+                    return e
+
+        return await asyncio.gather(*(deliver_one(row) for row in rows))
+
+    async def dispatch_once(self) -> int:
+        """
+        Claim and deliver one batch. Returns the number of rows claimed.
+        """
+        rows = await self._claim_batch()
+        if not rows:
+            return 0
+
+        otp_rows = [row for row in rows if row.kind == KIND_EMAIL_OTP]
+        otp_errors = await self._deliver(otp_rows)
+        errors = {row.id: error for row, error in zip(otp_rows, otp_errors)}
+        results = [
+            (
+                errors[row.id]
+                if row.kind == KIND_EMAIL_OTP
+                else ValueError(f"Unknown outbox message kind: {row.kind}")
+            )
+            for row in rows
+        ]
+
+        now = datetime.now(timezone.utc)
+        updates = []
+        for row, error in zip(rows, results):
+            if error is None:
+                updates.append(
+                    {
+                        "id": row.id,
+                        "status": OutboxStatus.SENT,
+                        "payload": _settled_payload(row.payload),
+                        "sent_at": now,
+                        "locked_until": None,
+                        "last_error": None,
+                    }
+                )
+                continue
+
+            logger.warning("Outbox message %s failed: %s", row.id, error)
+            if row.attempts >= OUTBOX_MAX_ATTEMPTS:
+                updates.append(
+                    {
+                        "id": row.id,
+                        "status": OutboxStatus.FAILED,
+                        "payload": _settled_payload(row.payload),
+                        "locked_until": None,
+                        "last_error": str(error),
+                    }
+                )
+            else:
+                retry_at = now + timedelta(seconds=_backoff_seconds(row.attempts))
+                updates.append(
+                    {
+                        "id": row.id,
+                        "next_attempt_at": retry_at,
+                        "locked_until": None,
+                        "last_error": str(error),
+                    }
+                )
+
+        # ORM bulk UPDATE by primary key -> one executemany round trip
+        async with SessionLocal() as db:
+            await db.execute(update(EmailOutbox), updates)
+            await db.commit()
+        return len(rows)
+
+    async def sweep(self) -> int:
+        """Delete sent / failed rows older than OUTBOX_RETENTION_SECONDS."""
+        cutoff = datetime.now(timezone.utc) - timedelta(
+            seconds=OUTBOX_RETENTION_SECONDS
+        )
+        async with SessionLocal() as db:
+            result = await db.execute(
+                delete(EmailOutbox).where(
+                    EmailOutbox.status != OutboxStatus.PENDING,
+                    EmailOutbox.created_at < cutoff,
+                )
+            )
+            await db.commit()
+        return result.rowcount
+
+    async def _sweep_if_due(self) -> None:
+        if time.monotonic() < self._next_sweep:
+            return
+        self._next_sweep = time.monotonic() + OUTBOX_SWEEP_SECONDS
+        try:
+            removed = await self.sweep()
+            if removed:
+                logger.info("Swept %s settled outbox messages", removed)
+        except Exception:
+            logger.exception("Outbox sweep failed")
+
+    def stop(self) -> None:
+        """
+        Let run() finish: it keeps dispatching while rounds find due
+        messages (e.g. OTPs committed by the last requests), then returns.
+        """
+        self._stopping = True
+        self._wakeup.set()
+
+    async def run(self) -> None:
+        """
+        Dispatch until stop(); meant to run as a background task from lifespan.
+        """
+        self._stopping = False
+        while True:
+            self._wakeup.clear()
+            try:
+                claimed = await self.dispatch_once()
+            except Exception:
+                logger.exception("Outbox dispatch round failed")
+                claimed = 0
+
+            if self._stopping:
+                if claimed:
+                    continue
+                return
+            await self._sweep_if_due()
+            # a full batch means there is probably more work waiting
+            if claimed >= OUTBOX_BATCH_SIZE:
+                continue
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), OUTBOX_POLL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+
+
+outbox_dispatcher = OutboxDispatcher()
@@ -0,0 +1,79 @@
+"""
+Local stand-in for the SendGrid v3 mail/send endpoint, for tests and
+throughput measurements.
+
+- POST /v3/mail/send                    -> 202, personalizations expanded
+- GET  /v3/scopes                       -> health probe
+- GET  /_fake/messages/{email}          -> last message rendered for email
+- GET  /_fake/stats                     -> API calls / messages received
+
+In-process:  httpx.ASGITransport(app=fake_app) as the mailer's transport
+Standalone:  python -m app.services.sendgrid.fake_server --port 8082
+             SENDGRID_API_URL=http://127.0.0.1:8082
+"""
+
+import argparse
+import asyncio
+import os
+
+from fastapi import FastAPI, Request, Response
+
+# optional artificial provider latency, to make benchmarks realistic
+FAKE_SENDGRID_LATENCY_MS = float(os.getenv("FAKE_SENDGRID_LATENCY_MS", "0"))
+
+fake_app = FastAPI(title="Fake SendGrid")
+last_message: dict[str, dict] = {}
+stats = {"calls": 0, "messages": 0}
+
+
+def _render(value: str, substitutions: dict) -> str:
+    for tag, replacement in substitutions.items():
+        value = value.replace(tag, replacement)
+    return value
+
+
+@fake_app.post("/v3/mail/send")
+async def mail_send(request: Request):
+    body = await request.json()
+    if FAKE_SENDGRID_LATENCY_MS > 0:
+        await asyncio.sleep(FAKE_SENDGRID_LATENCY_MS / 1000)
+
+    stats["calls"] += 1
+    for personalization in body["personalizations"]:
+        substitutions = personalization.get("substitutions", {})
+        for recipient in personalization["to"]:
+            stats["messages"] += 1
+            last_message[recipient["email"]] = {
+                "subject": body.get("subject"),
+                "substitutions": substitutions,
+                "content": [
+                    {"type": c["type"], "value": _render(c["value"], substitutions)}
+                    for c in body.get("content", [])
+                ],
+            }
+    return Response(status_code=202)
+
+
+@fake_app.get("/v3/scopes")
+async def read_scopes():
+    return {"scopes": ["mail.send"]}
+
+
+@fake_app.get("/_fake/messages/{email}")
+async def read_message(email: str):
+    return {"email": email, "message": last_message.get(email)}
+
+
+@fake_app.get("/_fake/stats")
+async def read_stats():
+    return stats
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Fake SendGrid mail/send server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8082)
+    args = parser.parse_args()
+    uvicorn.run(fake_app, host=args.host, port=args.port, log_level="warning")
@@ -1,56 +1,217 @@
 import os
-from dotenv import load_dotenv
-from sendgrid import SendGridAPIClient
-from sendgrid.helpers.mail import Mail
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional, Sequence
 
-from app.models.user import User
+import httpx
 
-load_dotenv()
+from app.core import config  # noqa: F401  (loads .env)
+from app.core import deadline, metrics
+from app.core.circuit_breaker import CircuitBreaker, CircuitOpenError
 
 SENDGRID_API_KEY = os.getenv("SENDGRID_API_KEY")
 EMAIL_FROM = os.getenv("EMAIL_FROM")
 
+# 🔹 Mailer config from env
+SENDGRID_API_URL = os.getenv("SENDGRID_API_URL", "https://api.sendgrid.com")
+SENDGRID_TIMEOUT_SECONDS = float(os.getenv("SENDGRID_TIMEOUT_SECONDS", "10"))
+SENDGRID_MAX_CONNECTIONS = int(os.getenv("SENDGRID_MAX_CONNECTIONS", "10"))
+# SendGrid accepts up to 1000 personalizations per request
+SENDGRID_BATCH_SIZE = min(int(os.getenv("SENDGRID_BATCH_SIZE", "500")), 1000)
+SENDGRID_BREAKER_FAILURES = int(os.getenv("SENDGRID_BREAKER_FAILURES", "5"))
+SENDGRID_BREAKER_RESET_SECONDS = float(
+    os.getenv("SENDGRID_BREAKER_RESET_SECONDS", "30")
+)
 
-def send_email_otp(user: User) -> None:
-    """
-    Sends a 6-digit OTP code to the user's email.
-    Assumes:
-    - user.email is set
-    - user.email_otp_code and user.email_otp_expires_at are set
-    """
-    if not SENDGRID_API_KEY:
-        raise RuntimeError("SENDGRID_API_KEY is not set")
-    if not EMAIL_FROM:
-        raise RuntimeError("EMAIL_FROM is not set")
-    if not user.email:
-        return
-
-    subject = "Your verification code for Rrii Tailor Gallery"
-
-    # Plain text email body
-    plain_text_content = (
-        f"Hi!\n\n"
-        f"Your verification code is: {user.email_otp_code}\n\n"
-        f"This code will expire at {user.email_otp_expires_at} (UTC).\n"
-    )
-
-    # HTML email body
-    html_content = f"""
+OTP_SUBJECT = "Your verification code for Rrii Tailor Gallery"
+
+# Substitution tags: the body is rendered once, SendGrid fills these in
+# per recipient from each personalization's "substitutions".
+CODE_TAG = "-otp_code-"
+EXPIRES_TAG = "-otp_expires_at-"
+
+OTP_TEXT_TEMPLATE = (
+    f"Hi!\n\n"
+    f"Your verification code is: {CODE_TAG}\n\n"
+    f"This code will expire at {EXPIRES_TAG} (UTC).\n"
+)
+
+OTP_HTML_TEMPLATE = f"""
     <p>Hi!</p>
     <p>Your verification code is:</p>
-    <p style="font-size: 24px; font-weight: bold;">{user.email_otp_code}</p>
-    <p>This code will expire at {user.email_otp_expires_at} (UTC).</p>
+    <p style="font-size: 24px; font-weight: bold;">{CODE_TAG}</p>
+    <p>This code will expire at {EXPIRES_TAG} (UTC).</p>
+    """
+
+
+class SendGridError(RuntimeError):
+    pass
+
+
+@dataclass(frozen=True)
+class OtpEmail:
+    email: str
+    code: str
+    expires_at: datetime
+
+
+class SendGridMailer:
     """
+    Long-lived async SendGrid v3 client.
+
+    - one pooled httpx client reused for every send
+    - OTP subject/text/HTML compiled once; only per-recipient
+      substitutions change between messages
+    - many recipients per API call through personalizations
+    - a circuit breaker so a degraded SendGrid fails fast
+    - sends made for a request time out with the request's deadline
+
+    `transport` lets tests/benchmarks route calls to an in-process fake
+    (see app/services/sendgrid/fake_server.py).
+    """
+
+    def __init__(
+        self,
+        api_key: Optional[str],
+        email_from: Optional[str],
+        api_url: str = SENDGRID_API_URL,
+        timeout_seconds: float = SENDGRID_TIMEOUT_SECONDS,
+        max_connections: int = SENDGRID_MAX_CONNECTIONS,
+        batch_size: int = SENDGRID_BATCH_SIZE,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.api_key = api_key
+        self.email_from = email_from
+        self.api_url = api_url
+        self.timeout_seconds = timeout_seconds
+        self.max_connections = max_connections
+        self.batch_size = batch_size
+        self.transport = transport
+        self.breaker = CircuitBreaker(
+            "sendgrid", SENDGRID_BREAKER_FAILURES, SENDGRID_BREAKER_RESET_SECONDS
+        )
+        metrics.track_circuit_breaker(self.breaker)
+        self._client: Optional[httpx.AsyncClient] = None
+        self._otp_message = {
+            "from": {"email": email_from},
+            "subject": OTP_SUBJECT,
+            "content": [
+                {"type": "text/plain", "value": OTP_TEXT_TEMPLATE},
+                {"type": "text/html", "value": OTP_HTML_TEMPLATE},
+            ],
+        }
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            if not self.api_key:
+                raise SendGridError("SENDGRID_API_KEY is not set")
+            if not self.email_from:
+                raise SendGridError("EMAIL_FROM is not set")
+            self._client = httpx.AsyncClient(
+                base_url=self.api_url,
+                headers={"Authorization": f"Bearer {self.api_key}"},
+                timeout=self.timeout_seconds,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                ),
+                transport=self.transport,
+            )
+        return self._client
+
+    async def _send(self, body: dict) -> None:
+        client = self._get_client()
+        timeout_seconds = deadline.clamp(self.timeout_seconds, "provider")
+        try:
+            self.breaker.before_call()
+        except CircuitOpenError:
+            metrics.provider_errors_total.inc("sendgrid", "mail_send", "circuit_open")
+            raise
+        start = time.perf_counter()
+        try:
+            response = await client.post(
+                "/v3/mail/send", json=body, timeout=timeout_seconds
+            )
+        except httpx.HTTPError as e:
+            if deadline.expired():
+                self.breaker.record_cancelled()
+                metrics.request_deadline_exceeded_total.inc("provider")
+                raise deadline.DeadlineExceeded() from e
+            self.breaker.record_failure()
+            metrics.provider_errors_total.inc(
+                "sendgrid", "mail_send", metrics.provider_error_reason(e)
+            )
+            raise SendGridError(f"SendGrid request failed: {e!r}") from e
+        except BaseException:
+            # cancelled, or anything unexpected: no verdict, but a half-open
+            # breaker must get its trial slot back
+            self.breaker.record_cancelled()
+            raise
+        finally:
+            metrics.provider_request_duration_seconds.observe(
+                time.perf_counter() - start, "sendgrid", "mail_send"
+            )
+
+        if response.status_code >= 500 or response.status_code == 429:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+        if response.status_code >= 400:
+            metrics.provider_errors_total.inc(
+                "sendgrid", "mail_send", metrics.http_error_reason(response.status_code)
+            )
+            raise SendGridError(
+                f"SendGrid error {response.status_code}: {response.text}"
+            )
+
+    @staticmethod
+    def _personalization(message: OtpEmail) -> dict:
+        return {
+            "to": [{"email": message.email}],
+            "substitutions": {
+                CODE_TAG: message.code,
+                EXPIRES_TAG: str(message.expires_at),
+            },
+        }
+
+    async def send_email_otp_batch(self, messages: Sequence[OtpEmail]) -> None:
+        """
+        Send OTP emails, `batch_size` recipients per API call.
+        """
+        for start in range(0, len(messages), self.batch_size):
+            chunk = messages[start : start + self.batch_size]
+            body = dict(self._otp_message)
+            body["personalizations"] = [self._personalization(m) for m in chunk]
+            await self._send(body)
+
+    async def send_email_otp(self, email: str, code: str, expires_at: datetime) -> None:
+        """
+        Sends a 6-digit OTP code to the given email.
+        Called by the outbox dispatcher, never directly from a request.
+        """
+        if not email:
+            return
+        await self.send_email_otp_batch([OtpEmail(email, code, expires_at)])
+
+    async def ping(self, timeout_seconds: float) -> int:
+        """
+        Reachability probe for the health checker: lists the API key's
+        scopes, which sends nothing. Returns the HTTP status; bypasses the
+        breaker so probes never trip it.
+        """
+        client = self._get_client()
+        response = await client.get("/v3/scopes", timeout=timeout_seconds)
+        return response.status_code
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+mailer = SendGridMailer(SENDGRID_API_KEY, EMAIL_FROM)
+
 
-    # Build SendGrid Mail object
-    message = Mail(
-        from_email=EMAIL_FROM,
-        to_emails=user.email,
-        subject=subject,
-        plain_text_content=plain_text_content,
-        html_content=html_content,
-    )
-
-    # Create client and send the email
-    sg = SendGridAPIClient(SENDGRID_API_KEY)
-    sg.send(message)
+async def send_email_otp(email: str, code: str, expires_at: datetime) -> None:
+    await mailer.send_email_otp(email, code, expires_at)
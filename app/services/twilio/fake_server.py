@@ -0,0 +1,100 @@
+"""
+Local stand-in for the Twilio Verify v2 API, for tests and benchmarks.
+
+Implements just the endpoints the app uses:
+- POST /v2/Services/{sid}/Verifications      (To, Channel) -> pending
+- POST /v2/Services/{sid}/VerificationCheck  (To, Code)    -> approved / pending / 404
+- GET  /v2/Services/{sid}                    health probe
+
+Issued codes can be read back at GET /_fake/codes/{phone_number}.
+
+In-process:  httpx.ASGITransport(app=fake_app) as the client's transport
+Standalone:  python -m app.services.twilio.fake_server --port 8081
+             TWILIO_VERIFY_BASE_URL=http://127.0.0.1:8081/v2
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import uuid
+from urllib.parse import parse_qs
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+# optional artificial provider latency, to make benchmarks realistic
+FAKE_TWILIO_LATENCY_MS = float(os.getenv("FAKE_TWILIO_LATENCY_MS", "0"))
+
+fake_app = FastAPI(title="Fake Twilio Verify")
+codes: dict[str, str] = {}
+stats = {"verifications": 0, "checks": 0}
+
+
+async def _latency() -> None:
+    if FAKE_TWILIO_LATENCY_MS > 0:
+        await asyncio.sleep(FAKE_TWILIO_LATENCY_MS / 1000)
+
+
+async def _form(request: Request) -> dict:
+    # parsed by hand so the fake doesn't need python-multipart
+    body = parse_qs((await request.body()).decode())
+    return {key: values[0] for key, values in body.items()}
+
+
+@fake_app.post("/v2/Services/{service_sid}/Verifications")
+async def create_verification(service_sid: str, request: Request):
+    form = await _form(request)
+    await _latency()
+    stats["verifications"] += 1
+    codes[form["To"]] = f"{random.randint(0, 999999):06d}"
+    return {
+        "sid": f"VE{uuid.uuid4().hex}",
+        "service_sid": service_sid,
+        "to": form["To"],
+        "channel": form.get("Channel", "sms"),
+        "status": "pending",
+    }
+
+
+@fake_app.post("/v2/Services/{service_sid}/VerificationCheck")
+async def check_verification(service_sid: str, request: Request):
+    form = await _form(request)
+    to, code = form["To"], form["Code"]
+    await _latency()
+    stats["checks"] += 1
+    expected = codes.get(to)
+    if expected is None:
+        return JSONResponse(
+            status_code=404,
+            content={"code": 20404, "message": "Not found", "status": 404},
+        )
+    if code != expected:
+        return {"sid": f"VE{uuid.uuid4().hex}", "to": to, "status": "pending"}
+    del codes[to]
+    return {"sid": f"VE{uuid.uuid4().hex}", "to": to, "status": "approved"}
+
+
+@fake_app.get("/v2/Services/{service_sid}")
+async def fetch_service(service_sid: str):
+    return {"sid": service_sid, "friendly_name": "Fake Verify"}
+
+
+@fake_app.get("/_fake/codes/{phone_number}")
+async def read_code(phone_number: str):
+    return {"phone_number": phone_number, "code": codes.get(phone_number)}
+
+
+@fake_app.get("/_fake/stats")
+async def read_stats():
+    return stats
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    args = parser.parse_args()
+    uvicorn.run(fake_app, host=args.host, port=args.port, log_level="warning")
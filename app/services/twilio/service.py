@@ -1,29 +1,197 @@
+import asyncio
 import os
-from twilio.rest import Client
-from dotenv import load_dotenv
+import time
+from dataclasses import dataclass
+from typing import Optional
 
-load_dotenv()
+import httpx
+
+from app.core import config  # noqa: F401  (loads .env)
+from app.core import deadline, metrics
+from app.core.circuit_breaker import CircuitBreaker, CircuitOpenError
 
 ACCOUNT_SID = os.getenv("TWILIO_ACCOUNT_SID")
 AUTH_TOKEN = os.getenv("TWILIO_AUTH_TOKEN")
 VERIFY_SERVICE_SID = os.getenv("TWILIO_VERIFY_SERVICE_SID")
 
-client = Client(ACCOUNT_SID, AUTH_TOKEN)
+# 🔹 Verify client config from env
+TWILIO_VERIFY_BASE_URL = os.getenv(
+    "TWILIO_VERIFY_BASE_URL", "https://verify.twilio.com/v2"
+)
+TWILIO_TIMEOUT_SECONDS = float(os.getenv("TWILIO_TIMEOUT_SECONDS", "5"))
+TWILIO_MAX_CONCURRENCY = int(os.getenv("TWILIO_MAX_CONCURRENCY", "20"))
+TWILIO_BREAKER_FAILURES = int(os.getenv("TWILIO_BREAKER_FAILURES", "5"))
+TWILIO_BREAKER_RESET_SECONDS = float(os.getenv("TWILIO_BREAKER_RESET_SECONDS", "30"))
+
+
+class TwilioVerifyError(RuntimeError):
+    pass
+
+
+@dataclass(frozen=True)
+class Verification:
+    sid: Optional[str]
+    status: str
+
+
+class TwilioVerifyClient:
+    """
+    Async Twilio Verify v2 client.
+
+    - one keep-alive httpx pool shared by every call
+    - a deadline per call (covers waiting for a concurrency slot too),
+      cut down to what is left of the request's deadline
+    - at most `max_concurrency` calls in flight
+    - a circuit breaker that fails fast while Twilio keeps erroring
+
+    `transport` lets tests/benchmarks route calls to an in-process fake
+    (see app/services/twilio/fake_server.py).
+    """
+
+    def __init__(
+        self,
+        account_sid: Optional[str],
+        auth_token: Optional[str],
+        service_sid: Optional[str],
+        base_url: str = TWILIO_VERIFY_BASE_URL,
+        timeout_seconds: float = TWILIO_TIMEOUT_SECONDS,
+        max_concurrency: int = TWILIO_MAX_CONCURRENCY,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.account_sid = account_sid
+        self.auth_token = auth_token
+        self.service_sid = service_sid
+        self.base_url = base_url
+        self.timeout_seconds = timeout_seconds
+        self.max_concurrency = max_concurrency
+        self.transport = transport
+        self.breaker = CircuitBreaker(
+            "twilio", TWILIO_BREAKER_FAILURES, TWILIO_BREAKER_RESET_SECONDS
+        )
+        metrics.track_circuit_breaker(self.breaker)
+        self._client: Optional[httpx.AsyncClient] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                auth=(self.account_sid or "", self.auth_token or ""),
+                timeout=self.timeout_seconds,
+                limits=httpx.Limits(
+                    max_connections=self.max_concurrency,
+                    max_keepalive_connections=self.max_concurrency,
+                ),
+                transport=self.transport,
+            )
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._client
+
+    async def _post(self, operation: str, path: str, data: dict) -> httpx.Response:
+        client = self._get_client()
+        timeout_seconds = deadline.clamp(self.timeout_seconds, "provider")
+        try:
+            self.breaker.before_call()
+        except CircuitOpenError:
+            metrics.provider_errors_total.inc("twilio", operation, "circuit_open")
+            raise
+        start = time.perf_counter()
+        try:
+            async with asyncio.timeout(timeout_seconds):
+                async with self._semaphore:
+                    response = await client.post(path, data=data)
+        except (httpx.HTTPError, TimeoutError) as e:
+            if deadline.expired():
+                # our budget ran out, not Twilio's fault: no verdict
+                self.breaker.record_cancelled()
+                metrics.request_deadline_exceeded_total.inc("provider")
+                raise deadline.DeadlineExceeded() from e
+            self.breaker.record_failure()
+            metrics.provider_errors_total.inc(
+                "twilio", operation, metrics.provider_error_reason(e)
+            )
+            raise TwilioVerifyError(f"Twilio request failed: {e!r}") from e
+        except BaseException:
+            # cancelled, or anything unexpected: no verdict, but a half-open
+            # breaker must get its trial slot back
+            self.breaker.record_cancelled()
+            raise
+        finally:
+            metrics.provider_request_duration_seconds.observe(
+                time.perf_counter() - start, "twilio", operation
+            )
+
+        # 5xx / 429 mean Twilio is degraded; other 4xx are about our input
+        if response.status_code >= 500 or response.status_code == 429:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+        if response.status_code >= 400:
+            metrics.provider_errors_total.inc(
+                "twilio", operation, metrics.http_error_reason(response.status_code)
+            )
+        return response
+
+    @staticmethod
+    def _error(response: httpx.Response) -> TwilioVerifyError:
+        try:
+            message = response.json().get("message")
+        except ValueError:
+            message = response.text
+        return TwilioVerifyError(f"Twilio error {response.status_code}: {message}")
+
+    async def send_verification_code(self, phone_number: str) -> Verification:
+        response = await self._post(
+            "send",
+            f"/Services/{self.service_sid}/Verifications",
+            {"To": phone_number, "Channel": "sms"},
+        )
+        if response.status_code >= 400:
+            raise self._error(response)
+        body = response.json()
+        return Verification(sid=body.get("sid"), status=body["status"])
+
+    async def check_verification_code(
+        self, phone_number: str, code: str
+    ) -> Verification:
+        response = await self._post(
+            "check",
+            f"/Services/{self.service_sid}/VerificationCheck",
+            {"To": phone_number, "Code": code},
+        )
+        # 404: no pending verification (expired, already approved, too many tries)
+        if response.status_code == 404:
+            return Verification(sid=None, status="not_found")
+        if response.status_code >= 400:
+            raise self._error(response)
+        body = response.json()
+        return Verification(sid=body.get("sid"), status=body["status"])
+
+    async def ping(self, timeout_seconds: float) -> int:
+        """
+        Reachability probe for the health checker: a free, read-only fetch
+        of the Verify service. Returns the HTTP status; bypasses the
+        breaker and the concurrency limit so it never competes with or
+        trips on real traffic.
+        """
+        client = self._get_client()
+        response = await client.get(
+            f"/Services/{self.service_sid}", timeout=timeout_seconds
+        )
+        return response.status_code
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+twilio_verify = TwilioVerifyClient(ACCOUNT_SID, AUTH_TOKEN, VERIFY_SERVICE_SID)
 
 
-def send_verification_code(phone_number: str):
-    verification = client.verify.v2.services(VERIFY_SERVICE_SID).verifications.create(
-        to=phone_number,
-        channel="sms",
-    )
-    return verification
+async def send_verification_code(phone_number: str) -> Verification:
+    return await twilio_verify.send_verification_code(phone_number)
 
 
-def check_verification_code(phone_number: str, code: str):
-    verification_check = client.verify.v2.services(
-        VERIFY_SERVICE_SID
-    ).verification_checks.create(
-        to=phone_number,
-        code=code,
-    )
-    return verification_check
+async def check_verification_code(phone_number: str, code: str) -> Verification:
+    return await twilio_verify.check_verification_code(phone_number, code)
@@ -0,0 +1,308 @@
+"""
+Bulk user import from streaming CSV or JSON Lines.
+
+Rows are validated with UserImportRow and processed in batches of
+IMPORT_BATCH_SIZE:
+- emails / phone numbers repeated within the file are reported, not inserted
+- accounts that already exist are looked up before hashing, so no bcrypt
+  time is spent on rows that would be skipped anyway
+- passwords are hashed in chunks across the password pool's workers
+- the batch is written with one multi-row INSERT ... ON CONFLICT DO NOTHING;
+  rows a concurrent signup got to first come back as "existing"
+- with send_otp, verification emails go through the outbox in the same
+  transaction
+
+Each batch commits on its own, so a failure halfway keeps what was
+already imported; re-running the same file skips those rows as existing.
+
+Input rows must not span lines (no quoted newlines in CSV fields).
+
+CLI (direct DB access, no admin token):
+    python -m app.services.user_import.service users.csv [--send-otp]
+"""
+
+import argparse
+import asyncio
+import codecs
+import csv
+import json
+import os
+import sys
+import time
+from typing import AsyncIterator, Iterable, Optional, Union
+
+from pydantic import TypeAdapter, ValidationError
+from sqlalchemy import func, select
+
+from app.core.otp_store import otp_store
+from app.core.password_pool import (
+    PASSWORD_POOL_SIZE,
+    hash_passwords_in_pool,
+    shutdown_password_pool,
+)
+from app.db import SessionLocal, dialect_insert, engine
+from app.models.otp import OtpChannel
+from app.models.user import User
+from app.schemas.user import UserImportRow
+from app.services.outbox.service import enqueue_email_otp, outbox_dispatcher
+
+# 🔹 User import config from env
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "500"))
+IMPORT_MAX_ERRORS = int(os.getenv("IMPORT_MAX_ERRORS", "1000"))
+IMPORT_HASH_CHUNK = int(os.getenv("IMPORT_HASH_CHUNK", "16"))
+# pool jobs an API import may hold at once; one worker stays free for logins
+IMPORT_HASH_JOBS = int(
+    os.getenv("IMPORT_HASH_JOBS", str(max(1, PASSWORD_POOL_SIZE - 1)))
+)
+
+FORMATS = ("csv", "jsonl")
+
+_row_adapter = TypeAdapter(UserImportRow)
+
+# (line number, parsed record or the reason it couldn't be parsed)
+Record = tuple[int, Union[dict, str]]
+
+
+def detect_format(content_type: Optional[str], filename: str = "") -> str:
+    if (content_type and "csv" in content_type) or filename.endswith(".csv"):
+        return "csv"
+    return "jsonl"
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """
+    Decode a byte stream into lines without holding more than one chunk
+    plus a partial line in memory.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line.rstrip("\r")
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending.rstrip("\r")
+
+
+async def iter_records(lines: AsyncIterator[str], fmt: str) -> AsyncIterator[Record]:
+    header: Optional[list[str]] = None
+    line_number = 0
+    async for line in lines:
+        line_number += 1
+        if not line.strip():
+            continue
+        if fmt == "jsonl":
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                yield line_number, f"invalid JSON: {e}"
+                continue
+            if not isinstance(record, dict):
+                yield line_number, "expected a JSON object"
+                continue
+            yield line_number, record
+            continue
+
+        values = next(csv.reader([line]))
+        if header is None:
+            header = [name.strip() for name in values]
+            continue
+        if len(values) != len(header):
+            yield line_number, f"expected {len(header)} fields, got {len(values)}"
+            continue
+        # empty CSV cells mean "not given", e.g. no phone number
+        yield line_number, {k: v for k, v in zip(header, values) if v != ""}
+
+
+def _validation_message(error: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in e['loc']) or 'row'}: {e['msg']}"
+        for e in error.errors()
+    )
+
+
+class UserImporter:
+    def __init__(
+        self,
+        send_otp: bool = False,
+        batch_size: int = IMPORT_BATCH_SIZE,
+        hash_jobs: int = IMPORT_HASH_JOBS,
+        max_errors: int = IMPORT_MAX_ERRORS,
+    ):
+        self.send_otp = send_otp
+        self.batch_size = batch_size
+        self.hash_jobs = hash_jobs
+        self.max_errors = max_errors
+        self.counts = dict.fromkeys(
+            ("total", "created", "existing", "duplicates", "invalid"), 0
+        )
+        self.errors: list[dict] = []
+        self.errors_truncated = False
+        self._seen_emails: set[str] = set()
+        self._seen_phones: set[str] = set()
+
+    def _error(self, kind: str, line: int, error: str, email=None) -> None:
+        self.counts[kind] += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append({"line": line, "email": email, "error": error})
+        else:
+            self.errors_truncated = True
+
+    def _accept(self, line: int, record: Union[dict, str]) -> Optional[UserImportRow]:
+        if isinstance(record, str):
+            self._error("invalid", line, record)
+            return None
+        try:
+            row = _row_adapter.validate_python(record)
+        except ValidationError as e:
+            self._error("invalid", line, _validation_message(e), record.get("email"))
+            return None
+
+        if row.email in self._seen_emails:
+            self._error("duplicates", line, "email repeated in this file", row.email)
+            return None
+        if row.phone_number and row.phone_number in self._seen_phones:
+            self._error("duplicates", line, "phone repeated in this file", row.email)
+            return None
+        self._seen_emails.add(row.email)
+        if row.phone_number:
+            self._seen_phones.add(row.phone_number)
+        return row
+
+    async def _existing(self, db, rows: list[UserImportRow]) -> tuple[set, set]:
+        emails = [row.email for row in rows]
+        phones = [row.phone_number for row in rows if row.phone_number]
+        existing_emails = set(
+            await db.scalars(
+                select(func.lower(User.email)).where(func.lower(User.email).in_(emails))
+            )
+        )
+        existing_phones = (
+            set(
+                await db.scalars(
+                    select(User.phone_number).where(User.phone_number.in_(phones))
+                )
+            )
+            if phones
+            else set()
+        )
+        return existing_emails, existing_phones
+
+    async def _flush(self, batch: list[tuple[int, UserImportRow]]) -> None:
+        # short sessions on both sides of the hashing: a batch takes seconds
+        # of bcrypt, and a connection must not sit idle in a transaction
+        # (holding back vacuum, using up the pool) meanwhile
+        async with SessionLocal() as db:
+            existing_emails, existing_phones = await self._existing(
+                db, [row for _, row in batch]
+            )
+        new = []
+        for line, row in batch:
+            if row.email in existing_emails:
+                self._error("existing", line, "email already registered", row.email)
+            elif row.phone_number in existing_phones:
+                self._error("existing", line, "phone already registered", row.email)
+            else:
+                new.append((line, row))
+        if not new:
+            return
+
+        hashes = await hash_passwords_in_pool(
+            [row.password for _, row in new], IMPORT_HASH_CHUNK, self.hash_jobs
+        )
+
+        async with SessionLocal() as db:
+            # no conflict target: skip rows hitting any unique index
+            # (email or phone) that a concurrent signup took meanwhile
+            stmt = dialect_insert(db, User).on_conflict_do_nothing()
+            inserted = set(
+                await db.scalars(
+                    stmt.returning(User.email),
+                    [
+                        {
+                            "email": row.email,
+                            "phone_number": row.phone_number,
+                            "password_hash": password_hash,
+                            "auth_provider": "email",
+                            "role": row.role,
+                            "is_active": True,
+                            "is_email_verified": False,
+                        }
+                        for (_, row), password_hash in zip(new, hashes)
+                    ],
+                )
+            )
+            for line, row in new:
+                if row.email not in inserted:
+                    self._error("existing", line, "registered concurrently", row.email)
+                elif self.send_otp:
+                    code, expires_at = await otp_store.issue(
+                        db, OtpChannel.EMAIL, row.email
+                    )
+                    enqueue_email_otp(db, row.email, code, expires_at)
+            await db.commit()
+        self.counts["created"] += len(inserted)
+        if self.send_otp and inserted:
+            outbox_dispatcher.notify()
+
+    async def run(self, records: AsyncIterator[Record]) -> dict:
+        start = time.monotonic()
+        batch: list[tuple[int, UserImportRow]] = []
+        async for line, record in records:
+            self.counts["total"] += 1
+            row = self._accept(line, record)
+            if row is None:
+                continue
+            batch.append((line, row))
+            if len(batch) >= self.batch_size:
+                await self._flush(batch)
+                batch = []
+        if batch:
+            await self._flush(batch)
+        return self.report(time.monotonic() - start)
+
+    def report(self, elapsed: float) -> dict:
+        return {
+            **self.counts,
+            "errors": self.errors,
+            "errors_truncated": self.errors_truncated,
+            "elapsed_seconds": round(elapsed, 2),
+        }
+
+
+async def _read_file(path: str, chunk_size: int = 1 << 16) -> AsyncIterator[bytes]:
+    with open(path, "rb") as f:
+        while chunk := f.read(chunk_size):
+            yield chunk
+
+
+async def import_file(path: str, fmt: str, send_otp: bool, hash_jobs: int) -> dict:
+    importer = UserImporter(send_otp=send_otp, hash_jobs=hash_jobs)
+    try:
+        return await importer.run(iter_records(iter_lines(_read_file(path)), fmt))
+    finally:
+        await engine.dispose()
+
+
+def main(argv: Optional[Iterable[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Bulk-import users from CSV / JSONL")
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=FORMATS)
+    parser.add_argument("--send-otp", action="store_true")
+    # nothing else runs in this process, so every pool worker can hash
+    parser.add_argument("--hash-jobs", type=int, default=PASSWORD_POOL_SIZE)
+    args = parser.parse_args(argv)
+
+    fmt = args.format or detect_format(None, args.path)
+    try:
+        report = asyncio.run(import_file(args.path, fmt, args.send_otp, args.hash_jobs))
+    finally:
+        shutdown_password_pool()
+    json.dump(report, sys.stdout, indent=2)
+    sys.stdout.write("\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,16 @@
+"""
+End-to-end load tests for the auth API.
+
+Boots the Twilio and SendGrid fakes (app/services/*/fake_server.py) and
+`app.main:app` under uvicorn as separate processes, then drives a
+weighted mix of auth flows over real HTTP at a fixed concurrency.
+
+    # local Postgres (or sqlite:///./loadtest.db)
+    python -m loadtest --database-url postgresql://postgres@localhost/loadtest \
+        --concurrency 50 --duration 60 --save-baseline loadtest/baseline.json
+
+    # later: fail (exit 1) if p95 or throughput regressed by more than 20%
+    python -m loadtest --database-url ... --compare loadtest/baseline.json
+
+Use a throwaway database: the run creates users and never cleans up.
+"""
@@ -0,0 +1,146 @@
+import argparse
+import asyncio
+import os
+import platform
+import random
+import subprocess
+import sys
+from datetime import datetime, timezone
+
+import httpx
+
+from loadtest.harness import ROOT_DIR, Stack
+from loadtest.report import (
+    compare,
+    format_table,
+    load_baseline,
+    save_baseline,
+    summarize,
+)
+from loadtest.scenarios import (
+    DEFAULT_MIX,
+    Context,
+    Recorder,
+    parse_mix,
+    run_mix,
+    seed_accounts,
+)
+
+
+def _git_revision() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=ROOT_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+async def _run(args, app_url: str, twilio_url: str, sendgrid_url: str) -> dict:
+    limits = httpx.Limits(
+        max_connections=args.concurrency, max_keepalive_connections=args.concurrency
+    )
+    async with httpx.AsyncClient(
+        base_url=app_url, limits=limits, timeout=args.timeout
+    ) as app, httpx.AsyncClient(base_url=twilio_url) as twilio, httpx.AsyncClient(
+        base_url=sendgrid_url
+    ) as sendgrid:
+        ctx = Context(app, twilio, sendgrid)
+        await seed_accounts(ctx, args.seed_accounts, args.concurrency)
+
+        mix = parse_mix(args.mix)
+        if args.warmup > 0:
+            await run_mix(ctx, mix, args.concurrency, args.warmup)
+            ctx.recorder = Recorder()
+
+        elapsed = await run_mix(ctx, mix, args.concurrency, args.duration)
+
+    meta = {
+        "started_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "git_revision": _git_revision(),
+        "python": platform.python_version(),
+        "cpu_count": os.cpu_count(),
+        "database": None if args.app_url else args.database_url.split("://")[0],
+        "workers": args.workers,
+        "concurrency": args.concurrency,
+        "duration": args.duration,
+        "mix": args.mix,
+        "seed": args.seed,
+    }
+    return summarize(ctx.recorder, elapsed, meta)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m loadtest", description="Load test the auth API"
+    )
+    parser.add_argument(
+        "--database-url",
+        default=os.getenv("LOADTEST_DATABASE_URL", "sqlite:///./loadtest.db"),
+    )
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=30, help="seconds")
+    parser.add_argument("--warmup", type=float, default=5, help="seconds, unmeasured")
+    parser.add_argument("--mix", default=DEFAULT_MIX)
+    parser.add_argument("--seed-accounts", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=None, help="random seed")
+    parser.add_argument("--timeout", type=float, default=30, help="per request")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--app-port", type=int, default=8000)
+    parser.add_argument(
+        "--rate-limits", action="store_true", help="keep the auth rate limits on"
+    )
+    parser.add_argument(
+        "--app-url",
+        help="target an already running app (with the fakes as its providers) "
+        "instead of booting one",
+    )
+    parser.add_argument("--twilio-url", default="http://127.0.0.1:8081")
+    parser.add_argument("--sendgrid-url", default="http://127.0.0.1:8082")
+    parser.add_argument("--save-baseline", metavar="PATH")
+    parser.add_argument("--compare", metavar="PATH")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+
+    if args.seed is not None:
+        random.seed(args.seed)
+
+    if args.app_url:
+        summary = asyncio.run(
+            _run(args, args.app_url, args.twilio_url, args.sendgrid_url)
+        )
+    else:
+        with Stack(
+            args.database_url,
+            app_port=args.app_port,
+            workers=args.workers,
+            rate_limits=args.rate_limits,
+        ) as stack:
+            summary = asyncio.run(
+                _run(args, stack.app_url, stack.twilio_url, stack.sendgrid_url)
+            )
+
+    print(format_table(summary))
+    print("flows:", summary["flows"])
+
+    if args.save_baseline:
+        save_baseline(args.save_baseline, summary)
+        print(f"baseline written to {args.save_baseline}")
+
+    if args.compare:
+        regressions = compare(summary, load_baseline(args.compare), args.tolerance)
+        if regressions:
+            print(f"REGRESSIONS vs {args.compare}:")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print(f"no regressions vs {args.compare} (tolerance {args.tolerance:.0%})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
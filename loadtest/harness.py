@@ -0,0 +1,165 @@
+import os
+import subprocess
+import sys
+import time
+from typing import Optional
+
+import httpx
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class Stack:
+    """
+    The API plus both provider fakes, each in its own process.
+
+    Separate processes keep the fakes and the load generator from
+    competing with the app for its event loop, and allow `workers > 1`.
+    """
+
+    def __init__(
+        self,
+        database_url: str,
+        host: str = "127.0.0.1",
+        app_port: int = 8000,
+        twilio_port: int = 8081,
+        sendgrid_port: int = 8082,
+        workers: int = 1,
+        rate_limits: bool = False,
+        extra_env: Optional[dict] = None,
+    ):
+        self.database_url = database_url
+        self.host = host
+        self.app_port = app_port
+        self.twilio_port = twilio_port
+        self.sendgrid_port = sendgrid_port
+        self.workers = workers
+        self.rate_limits = rate_limits
+        self.extra_env = extra_env or {}
+        self._processes: list[subprocess.Popen] = []
+
+    @property
+    def app_url(self) -> str:
+        return f"http://{self.host}:{self.app_port}"
+
+    @property
+    def twilio_url(self) -> str:
+        return f"http://{self.host}:{self.twilio_port}"
+
+    @property
+    def sendgrid_url(self) -> str:
+        return f"http://{self.host}:{self.sendgrid_port}"
+
+    def env(self) -> dict:
+        env = dict(os.environ)
+        env.update(
+            {
+                "DATABASE_URL": self.database_url,
+                "TWILIO_ACCOUNT_SID": "ACloadtest",
+                "TWILIO_AUTH_TOKEN": "loadtest",
+                "TWILIO_VERIFY_SERVICE_SID": "VAloadtest",
+                "TWILIO_VERIFY_BASE_URL": f"{self.twilio_url}/v2",
+                "SENDGRID_API_KEY": "loadtest",
+                "SENDGRID_API_URL": self.sendgrid_url,
+                "EMAIL_FROM": "loadtest@example.com",
+                # every virtual user shares one IP; opt in with rate_limits
+                "RATE_LIMIT_ENABLED": "true" if self.rate_limits else "false",
+            }
+        )
+        env.update(self.extra_env)
+        return env
+
+    def _spawn(self, *args: str) -> None:
+        self._processes.append(
+            subprocess.Popen([sys.executable, *args], cwd=ROOT_DIR, env=self.env())
+        )
+
+    def _wait_ready(self, url: str, timeout: float = 60) -> None:
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            for process in self._processes:
+                if process.poll() is not None:
+                    raise RuntimeError(
+                        f"{process.args} exited with {process.returncode}"
+                    )
+            try:
+                if httpx.get(url, timeout=1).status_code < 500:
+                    return
+            except httpx.HTTPError:
+                pass
+            time.sleep(0.2)
+        raise RuntimeError(f"{url} not ready after {timeout}s")
+
+    def migrate(self) -> None:
+        # the app refuses to start on a database behind the Alembic head
+        subprocess.run(
+            [
+                sys.executable,
+                "-m",
+                "alembic",
+                "-c",
+                "app/alembic.ini",
+                "upgrade",
+                "head",
+            ],
+            cwd=ROOT_DIR,
+            env=self.env(),
+            check=True,
+        )
+
+    def start(self) -> "Stack":
+        self.migrate()
+        try:
+            self._spawn(
+                "-m",
+                "app.services.twilio.fake_server",
+                "--host",
+                self.host,
+                "--port",
+                str(self.twilio_port),
+            )
+            self._spawn(
+                "-m",
+                "app.services.sendgrid.fake_server",
+                "--host",
+                self.host,
+                "--port",
+                str(self.sendgrid_port),
+            )
+            self._wait_ready(f"{self.twilio_url}/_fake/stats")
+            self._wait_ready(f"{self.sendgrid_url}/_fake/stats")
+
+            self._spawn(
+                "-m",
+                "app.launcher",
+                "--host",
+                self.host,
+                "--port",
+                str(self.app_port),
+                "--workers",
+                str(self.workers),
+                "--log-level",
+                "warning",
+                "--no-access-log",
+            )
+            self._wait_ready(f"{self.app_url}/health/ready")
+        except BaseException:
+            self.stop()
+            raise
+        return self
+
+    def stop(self) -> None:
+        for process in reversed(self._processes):
+            process.terminate()
+        for process in reversed(self._processes):
+            try:
+                process.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        self._processes.clear()
+
+    def __enter__(self) -> "Stack":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
@@ -0,0 +1,97 @@
+import json
+import math
+from typing import Optional
+
+from loadtest.scenarios import Recorder
+
+
+def percentile(sorted_values: list[float], q: float) -> float:
+    """
+    Nearest-rank percentile of an already sorted list, q in [0, 100].
+    """
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(q / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def _route_summary(samples: list[float], errors: int, elapsed: float) -> dict:
+    values = sorted(samples)
+    return {
+        "count": len(values),
+        "errors": errors,
+        "rps": round(len(values) / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": round(percentile(values, 50) * 1000, 2),
+        "p95_ms": round(percentile(values, 95) * 1000, 2),
+        "p99_ms": round(percentile(values, 99) * 1000, 2),
+        "max_ms": round(values[-1] * 1000, 2) if values else 0.0,
+    }
+
+
+def summarize(recorder: Recorder, elapsed: float, meta: Optional[dict] = None) -> dict:
+    routes, all_samples, all_errors = {}, [], 0
+    for route in sorted(recorder.samples):
+        errors = sum(
+            n for code, n in recorder.statuses[route].items() if not 200 <= code < 300
+        )
+        routes[route] = _route_summary(recorder.samples[route], errors, elapsed)
+        routes[route]["statuses"] = {
+            str(code): n for code, n in sorted(recorder.statuses[route].items())
+        }
+        all_samples.extend(recorder.samples[route])
+        all_errors += errors
+
+    return {
+        "meta": {**(meta or {}), "elapsed_seconds": round(elapsed, 2)},
+        "total": _route_summary(all_samples, all_errors, elapsed),
+        "routes": routes,
+        "flows": {name: dict(counts) for name, counts in recorder.flows.items()},
+    }
+
+
+def format_table(summary: dict) -> str:
+    header = f"{'route':<32} {'count':>7} {'err':>5} {'rps':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8}"
+    lines = [header, "-" * len(header)]
+    rows = list(summary["routes"].items()) + [("TOTAL", summary["total"])]
+    for route, s in rows:
+        lines.append(
+            f"{route:<32} {s['count']:>7} {s['errors']:>5} {s['rps']:>8.1f} "
+            f"{s['p50_ms']:>8.1f} {s['p95_ms']:>8.1f} {s['p99_ms']:>8.1f} {s['max_ms']:>8.1f}"
+        )
+    lines.append("(latencies in ms)")
+    return "\n".join(lines)
+
+
+def save_baseline(path: str, summary: dict) -> None:
+    with open(path, "w") as f:
+        json.dump(summary, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def load_baseline(path: str) -> dict:
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare(summary: dict, baseline: dict, tolerance: float) -> list[str]:
+    """
+    Regressions beyond `tolerance` (0.2 = 20%): higher p95/p99, lower
+    throughput or a higher error rate, per route and in total.
+    """
+    regressions = []
+    pairs = [("TOTAL", summary["total"], baseline["total"])] + [
+        (route, current, baseline["routes"][route])
+        for route, current in summary["routes"].items()
+        if route in baseline["routes"]
+    ]
+    for route, current, base in pairs:
+        for key in ("p95_ms", "p99_ms"):
+            if base[key] and current[key] > base[key] * (1 + tolerance):
+                regressions.append(f"{route}: {key} {base[key]} -> {current[key]}")
+        if base["rps"] and current["rps"] < base["rps"] * (1 - tolerance):
+            regressions.append(f"{route}: rps {base['rps']} -> {current['rps']}")
+        base_rate = base["errors"] / base["count"] if base["count"] else 0
+        rate = current["errors"] / current["count"] if current["count"] else 0
+        if rate > base_rate + tolerance / 10:
+            regressions.append(f"{route}: error rate {base_rate:.1%} -> {rate:.1%}")
+    return regressions
@@ -0,0 +1,223 @@
+import asyncio
+import itertools
+import random
+import time
+from collections import Counter, defaultdict
+from typing import Awaitable, Callable, Optional
+
+import httpx
+
+API_PREFIX = "/api/v1/auth"
+CODE_POLL_SECONDS = 0.05
+CODE_TIMEOUT_SECONDS = 30
+
+
+class FlowError(RuntimeError):
+    pass
+
+
+class Recorder:
+    """
+    Latency samples and status codes per route ("POST /email/login").
+    """
+
+    def __init__(self):
+        self.samples: dict[str, list[float]] = defaultdict(list)
+        self.statuses: dict[str, Counter] = defaultdict(Counter)
+        self.flows: dict[str, Counter] = defaultdict(Counter)
+
+    def record(self, route: str, seconds: float, status_code: int) -> None:
+        self.samples[route].append(seconds)
+        self.statuses[route][status_code] += 1
+
+    def flow_done(self, name: str, ok: bool) -> None:
+        self.flows[name]["completed" if ok else "failed"] += 1
+
+
+class Context:
+    """
+    Shared state for one run: HTTP clients, the recorder, seeded accounts.
+    """
+
+    def __init__(
+        self,
+        app: httpx.AsyncClient,
+        twilio: httpx.AsyncClient,
+        sendgrid: httpx.AsyncClient,
+        recorder: Optional[Recorder] = None,
+    ):
+        self.app = app
+        self.twilio = twilio
+        self.sendgrid = sendgrid
+        self.recorder = recorder or Recorder()
+        self.accounts: list[tuple[str, str]] = []
+        # unique emails/phones across runs against the same database
+        self._run_tag = f"{random.randrange(10**6):06d}"
+        self._ids = itertools.count()
+
+    def new_email(self) -> str:
+        return f"lt{self._run_tag}-{next(self._ids)}@loadtest.example.com"
+
+    def new_phone(self) -> str:
+        return f"+1999{self._run_tag}{next(self._ids):07d}"
+
+    async def post(self, path: str, json: dict, token: Optional[str] = None) -> dict:
+        headers = {"Authorization": f"Bearer {token}"} if token else None
+        start = time.perf_counter()
+        try:
+            response = await self.app.post(
+                f"{API_PREFIX}{path}", json=json, headers=headers
+            )
+        except httpx.HTTPError as e:
+            self.recorder.record(f"POST {path}", time.perf_counter() - start, 0)
+            raise FlowError(f"POST {path}: {e!r}") from e
+        self.recorder.record(
+            f"POST {path}", time.perf_counter() - start, response.status_code
+        )
+        if response.status_code != 200:
+            raise FlowError(f"POST {path}: {response.status_code} {response.text}")
+        return response.json()
+
+    async def _poll(self, read: Callable[[], Awaitable[Optional[str]]]) -> str:
+        deadline = time.monotonic() + CODE_TIMEOUT_SECONDS
+        while time.monotonic() < deadline:
+            code = await read()
+            if code:
+                return code
+            await asyncio.sleep(CODE_POLL_SECONDS)
+        raise FlowError("verification code never arrived")
+
+    async def phone_code(self, phone_number: str) -> str:
+        async def read():
+            response = await self.twilio.get(f"/_fake/codes/{phone_number}")
+            return response.json()["code"]
+
+        return await self._poll(read)
+
+    async def email_code(self, email: str) -> str:
+        # emails are delivered by the outbox dispatcher, so poll for them
+        async def read():
+            response = await self.sendgrid.get(f"/_fake/messages/{email}")
+            message = response.json()["message"]
+            return message and message["substitutions"]["-otp_code-"]
+
+        return await self._poll(read)
+
+
+# 🔹 Flows: each one is a realistic client journey through the API
+
+
+async def signup_email(ctx: Context) -> None:
+    email, password = ctx.new_email(), "loadtest-password"
+    await ctx.post("/email/register", {"email": email, "password": password})
+    code = await ctx.email_code(email)
+    await ctx.post("/email/verify-otp", {"email": email, "code": code})
+    await ctx.post("/email/login", {"email": email, "password": password})
+    ctx.accounts.append((email, password))
+
+
+async def login_email(ctx: Context) -> None:
+    if not ctx.accounts:
+        return await signup_email(ctx)
+    email, password = random.choice(ctx.accounts)
+    await ctx.post("/email/login", {"email": email, "password": password})
+
+
+async def login_phone(ctx: Context) -> str:
+    phone_number = ctx.new_phone()
+    await ctx.post("/phone/send-otp", {"phone_number": phone_number})
+    code = await ctx.phone_code(phone_number)
+    body = await ctx.post(
+        "/phone/verify-otp", {"phone_number": phone_number, "code": code}
+    )
+    return body["access_token"]
+
+
+async def bind_email(ctx: Context) -> None:
+    token = await login_phone(ctx)
+    email = ctx.new_email()
+    await ctx.post(
+        "/me/bind-email-start",
+        {"email": email, "password": "loadtest-password"},
+        token=token,
+    )
+    code = await ctx.email_code(email)
+    await ctx.post("/me/bind-email-verify", {"code": code}, token=token)
+
+
+async def bind_phone(ctx: Context) -> None:
+    email, password = ctx.new_email(), "loadtest-password"
+    await ctx.post("/email/register", {"email": email, "password": password})
+    body = await ctx.post("/email/login", {"email": email, "password": password})
+    token, phone_number = body["access_token"], ctx.new_phone()
+    await ctx.post("/me/bind-phone-start", {"phone_number": phone_number}, token=token)
+    code = await ctx.phone_code(phone_number)
+    await ctx.post(
+        "/me/bind-phone-verify",
+        {"phone_number": phone_number, "code": code},
+        token=token,
+    )
+
+
+FLOWS: dict[str, Callable[[Context], Awaitable]] = {
+    "signup_email": signup_email,
+    "login_email": login_email,
+    "login_phone": login_phone,
+    "bind_email": bind_email,
+    "bind_phone": bind_phone,
+}
+
+DEFAULT_MIX = "login_email=50,login_phone=20,signup_email=15,bind_phone=10,bind_email=5"
+
+
+def parse_mix(spec: str) -> dict[str, float]:
+    """'login_email=50,login_phone=20' -> {"login_email": 50.0, ...}"""
+    mix = {}
+    for part in spec.split(","):
+        name, _, weight = part.strip().partition("=")
+        if name not in FLOWS:
+            raise ValueError(f"Unknown flow {name!r}; choose from {sorted(FLOWS)}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+async def run_mix(
+    ctx: Context, mix: dict[str, float], concurrency: int, duration: float
+) -> float:
+    """
+    Closed loop: `concurrency` virtual users each pick a flow by weight
+    and start the next one as soon as the last finishes. Returns the
+    elapsed wall time.
+    """
+    names, weights = list(mix), list(mix.values())
+    deadline = time.monotonic() + duration
+
+    async def virtual_user() -> None:
+        while time.monotonic() < deadline:
+            name = random.choices(names, weights)[0]
+            try:
+                await FLOWS[name](ctx)
+                ctx.recorder.flow_done(name, ok=True)
+            except FlowError:
+                ctx.recorder.flow_done(name, ok=False)
+
+    start = time.monotonic()
+    await asyncio.gather(*(virtual_user() for _ in range(concurrency)))
+    return time.monotonic() - start
+
+
+async def seed_accounts(ctx: Context, count: int, concurrency: int) -> None:
+    """
+    Create verified email accounts for login_email; not measured.
+    """
+    recorder, ctx.recorder = ctx.recorder, Recorder()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one() -> None:
+        async with semaphore:
+            await signup_email(ctx)
+
+    try:
+        await asyncio.gather(*(one() for _ in range(count)))
+    finally:
+        ctx.recorder = recorder
@@ -0,0 +1,75 @@
+"""
+Micro-benchmark of the token response serialization paths, no DB or HTTP.
+
+    python -m loadtest.serialization [--number 20000]
+
+- fastapi_default: what FastAPI does for a dict returned through
+  response_model=TokenResponse with the stock JSONResponse (validate,
+  dump to JSON-able primitives, json.dumps)
+- orjson_default: the same with ORJSONResponse rendering
+- precompiled: app.core.responses.token_response
+"""
+
+import argparse
+import os
+import timeit
+import uuid
+
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite://")
+
+from fastapi.responses import JSONResponse, ORJSONResponse  # noqa: E402
+from pydantic import TypeAdapter  # noqa: E402
+
+from app.core.responses import token_response  # noqa: E402
+from app.models.user import User, UserRole  # noqa: E402
+from app.schemas.user import TokenResponse  # noqa: E402
+
+_response_adapter = TypeAdapter(TokenResponse)
+
+
+def _user() -> User:
+    return User(
+        id=42,
+        uuid=uuid.uuid4(),
+        email="someone@example.com",
+        phone_number="+15550001234",
+        password_hash="x" * 60,
+        auth_provider="email",
+        role=UserRole.USER,
+        is_active=True,
+        is_phone_verified=False,
+        is_email_verified=True,
+    )
+
+
+def _via_response_model(response_class, token: str, user: User) -> bytes:
+    content = {"access_token": token, "token_type": "Bearer", "user": user}
+    value = _response_adapter.validate_python(content)
+    return response_class(_response_adapter.dump_python(value, mode="json")).body
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--number", type=int, default=20000)
+    args = parser.parse_args()
+
+    token, user = "header.payload.signature" * 6, _user()
+    paths = {
+        "fastapi_default": lambda: _via_response_model(JSONResponse, token, user),
+        "orjson_default": lambda: _via_response_model(ORJSONResponse, token, user),
+        "precompiled": lambda: token_response(token, user).body,
+    }
+
+    results = {}
+    for name, fn in paths.items():
+        fn()  # warm up
+        best = min(timeit.repeat(fn, number=args.number, repeat=5))
+        results[name] = best / args.number * 1e6
+
+    baseline = results["fastapi_default"]
+    for name, micros in results.items():
+        print(f"{name:<16} {micros:8.2f} us/op  ({baseline / micros:4.1f}x)")
+
+
+if __name__ == "__main__":
+    main()